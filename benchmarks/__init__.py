@@ -0,0 +1,11 @@
+"""
+Performance measures of the framework.
+
+The scripts bench_context.py and bench_import.py measure a single topic each.
+The suite module times the hot calls on a synthetic studio tree created by the tree
+module and compares the results with a stored baseline.
+
+Examples:
+    python -m benchmarks.suite --output baseline.yaml
+    python -m benchmarks.suite --baseline baseline.yaml
+"""
@@ -0,0 +1,85 @@
+"""
+Measure the cost of building a path and duplicating a context.
+
+It times Location.path(), Location.parent(), FragBundle.duplicate() and Frag.duplicate()
+on a context extracted from a shot render path.
+
+To compare before/after a change, point --baseline to the python folder of another
+checkout of the framework. The same measures are then run in a separate process
+with that version of the ovfx package and both results are shown side by side.
+
+Examples:
+    git worktree add /tmp/ovfx_baseline <revision>
+    OVFX_CONFIG_DIR=samples/config python benchmarks/bench_context.py --baseline /tmp/ovfx_baseline/python
+"""
+import argparse
+import os
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SOURCE_PATH = '/mnt/prod/projects/MyProject/E400/Seq_010/0010/3D/houdini/render/fx_fire/v043/MyProject_E400_Seq_010_0010_fx_fire_v043.1001.tif'
+MODEL = ['software', 'render', 'image', 'shot']
+
+def measure(number):
+    """Return the average time in microseconds of each measured call"""
+    import ovfx.loc
+
+    location = ovfx.loc.Location(MODEL)
+    location.extract_frags(SOURCE_PATH)
+    frag = location.bundle('shot')
+
+    tests = [
+        ('Location.path()', lambda: location.path()),
+        ('Location.path(**kwargs)', lambda: location.path(shot='0020', frame='.1002')),
+        ('Location.parent()', lambda: location.parent('shot')),
+        ('FragBundle.duplicate()', lambda: location.bundle.duplicate()),
+        ('FragBundle.duplicate() + set', lambda: location.bundle.duplicate().set_value(shot='0020')),
+        ('Frag.duplicate()', lambda: frag.duplicate()),
+    ]
+    result = []
+    for name, func in tests:
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        result.append((name, seconds / number * 1e6))
+    return result
+
+def run(python_dir, number):
+    """Run the measures in a separate process using the ovfx package from python_dir"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = python_dir
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--child', '--number', str(number)], env=env)
+    result = []
+    for line in output.decode().splitlines():
+        name, value = line.rsplit('\t', 1)
+        result.append((name, float(value)))
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--baseline', help='python folder of the ovfx version to compare with')
+    parser.add_argument('--number', type=int, default=10000, help='number of calls per measure')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        for name, value in measure(args.number):
+            print('{}\t{}'.format(name, value))
+        return
+
+    if not os.getenv('OVFX_CONFIG_DIR'):
+        os.environ['OVFX_CONFIG_DIR'] = os.path.join(ROOT, 'samples', 'config')
+    current = run(os.path.join(ROOT, 'python'), args.number)
+    if args.baseline:
+        baseline = dict(run(args.baseline, args.number))
+        print('{:<32}{:>14}{:>14}{:>10}'.format('Call', 'Baseline (us)', 'Current (us)', 'Speedup'))
+        for name, value in current:
+            print('{:<32}{:>14.2f}{:>14.2f}{:>9.1f}x'.format(name, baseline[name], value, baseline[name] / value))
+    else:
+        print('{:<32}{:>14}'.format('Call', 'Current (us)'))
+        for name, value in current:
+            print('{:<32}{:>14.2f}'.format(name, value))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Measure the startup cost of a process importing ovfx.loc and reading both configs.
+
+Each measure is a new python process running:
+    import ovfx.loc; ovfx.cfg.fragment; ovfx.cfg.location
+
+Cold: the config cache is removed before each process so the yaml files are parsed.
+Warm: the config cache is up to date so yaml is neither imported nor parsed.
+
+Use --models to measure a larger location config. A temporary config folder is then
+created with the sample models duplicated under that many extra keys.
+
+Examples:
+    python benchmarks/bench_import.py --models 500
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODE = 'import ovfx.loc; ovfx.cfg.fragment; ovfx.cfg.location'
+
+def create_config(folder, models):
+    """Copy the sample configs in folder with the location models duplicated under extra keys"""
+    sample_dir = os.path.join(ROOT, 'samples', 'config')
+    shutil.copy(os.path.join(sample_dir, 'fragment.yaml'), folder)
+    with open(os.path.join(sample_dir, 'location.yaml')) as f:
+        location = yaml.safe_load(f)
+    for i in range(models):
+        location['studio_{:04d}'.format(i)] = dict(location['software'])
+    with open(os.path.join(folder, 'location.yaml'), 'w') as f:
+        yaml.safe_dump(location, f)
+    return _count(location)
+
+def _count(config):
+    return sum(_count(value) if isinstance(value, dict) else int(bool(value)) for value in config.values())
+
+def run(env, number, clear_cache=None):
+    """Return the best wall time in milliseconds of the import in a new process"""
+    result = []
+    for i in range(number):
+        if clear_cache and os.path.exists(clear_cache):
+            shutil.rmtree(clear_cache)
+        start = time.time()
+        subprocess.check_call([sys.executable, '-c', CODE], env=env)
+        result.append((time.time() - start) * 1000)
+    return min(result)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', type=int, default=0, help='number of extra copies of the sample software models')
+    parser.add_argument('--number', type=int, default=10, help='number of processes per measure')
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix='ovfx_bench_import_')
+    try:
+        config_dir = os.path.join(temp_dir, 'config')
+        os.makedirs(config_dir)
+        count = create_config(config_dir, args.models)
+        cache_dir = os.path.join(temp_dir, 'cache')
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.path.join(ROOT, 'python')
+        env['OVFX_CONFIG_DIR'] = config_dir
+        env['OVFX_CACHE_DIR'] = cache_dir
+
+        empty = min(_time_empty(env) for i in range(args.number))
+        cold = run(env, args.number, clear_cache=cache_dir)
+        run(env, 1) # Make sure the cache exists
+        warm = run(env, args.number)
+        print('Location models : {}'.format(count))
+        print('python -c pass  : {:8.1f} ms'.format(empty))
+        print('Cold import     : {:8.1f} ms'.format(cold))
+        print('Warm import     : {:8.1f} ms'.format(warm))
+        print('Speedup         : {:8.1f}x (excluding the interpreter startup)'.format((cold - empty) / max(warm - empty, 0.001)))
+    finally:
+        shutil.rmtree(temp_dir)
+
+def _time_empty(env):
+    start = time.time()
+    subprocess.check_call([sys.executable, '-c', 'pass'], env=env)
+    return (time.time() - start) * 1000
+
+if __name__ == '__main__':
+    main()
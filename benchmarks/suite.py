@@ -0,0 +1,147 @@
+"""
+Time the hot calls of the framework on a synthetic studio tree.
+
+A tree is generated in a temporary folder with benchmarks.tree and each call is
+timed on it. The results are written as YAML with the scale of the tree so they
+can be stored and compared with a later run. With --baseline, each result is
+compared with the stored one and the slower ones are reported as regressions.
+
+To measure another version of the framework, point --python to its python folder.
+
+Examples:
+    python -m benchmarks.suite --output baseline.yaml
+    python -m benchmarks.suite --baseline baseline.yaml --threshold 0.2
+    python -m benchmarks.suite --python /tmp/ovfx_other/python --output other.yaml
+"""
+import argparse
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import timeit
+
+import yaml
+
+from benchmarks import tree
+
+VERSION = 1
+
+def measure(config_dir, files, number):
+    """Return a list of (name, average time in microseconds) of each measured call"""
+    os.environ['OVFX_CONFIG_DIR'] = config_dir
+    import ovfx.loc
+    import ovfx.path
+
+    source = ovfx.loc.Location(tree.MODEL)
+    target = ovfx.loc.Location(tree.TARGET_MODEL)
+    source.extract_frags(files[0])
+    sample = files[::max(1, len(files) // 1000)]
+    seq_path = files[0]
+
+    def extract():
+        for path in sample:
+            source.extract_frags(path)
+
+    def listing():
+        ovfx.path.Seq(seq_path).files()
+
+    def frames():
+        seq = ovfx.path.Seq(seq_path)
+        seq.files()
+        return seq.frames()
+
+    def size():
+        ovfx.path.Seq(seq_path).size(human_readable=False)
+
+    frame_count = len(ovfx.path.Seq(seq_path).files())
+    # (name, function, number of items per call, number of calls)
+    tests = [
+        ('Location.extract_frags', extract, len(sample), max(1, number // len(sample))),
+        ('Location.path', lambda: source.path(), 1, number),
+        ('Location.path(**kwargs)', lambda: source.path(shot='0020', frame='.1002'), 1, number),
+        ('FragBundle.translate', lambda: source.bundle.translate(target.model()), 1, number),
+        ('FragBundle.duplicate', lambda: source.bundle.duplicate(), 1, number),
+        ('Seq.files', listing, 1, max(1, number // frame_count)),
+        ('Seq.frames', frames, 1, max(1, number // frame_count)),
+        ('Seq.size', size, 1, max(1, number // frame_count)),
+    ]
+    result = []
+    for name, func, items, calls in tests:
+        seconds = min(timeit.repeat(func, number=calls, repeat=3))
+        result.append((name, seconds / calls / items * 1e6))
+    return result
+
+def run(projects, shots, frames, number, folder=None):
+    """Generate the tree, measure and return the results as a dictionary"""
+    temp = folder is None
+    if temp:
+        folder = tempfile.mkdtemp(prefix='ovfx_bench_')
+    try:
+        config_dir, files = tree.generate(folder, projects=projects, shots=shots, frames=frames)
+        results = measure(config_dir, files, number)
+    finally:
+        if temp:
+            shutil.rmtree(folder)
+    return {
+        'version': VERSION,
+        'scale': {'projects': projects, 'shots': shots, 'frames': frames, 'files': len(files), 'number': number},
+        'python': platform.python_version(),
+        'unit': 'us per call',
+        'results': dict(results),
+    }
+
+def compare(current, baseline, threshold):
+    """
+    Return a list of (name, baseline, current, ratio, regression) for the calls found in both.
+
+    A regression is a call slower than the baseline by more than threshold. Eg. 0.1 for 10%.
+    """
+    result = []
+    for name, value in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        base = baseline['results'][name]
+        ratio = value / base if base else 1.0
+        result.append((name, base, value, ratio, ratio > 1.0 + threshold))
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--projects', type=int, default=2)
+    parser.add_argument('--shots', type=int, default=10, help='number of shots per project')
+    parser.add_argument('--frames', type=int, default=200, help='number of frames per element')
+    parser.add_argument('--number', type=int, default=10000, help='number of calls per measure')
+    parser.add_argument('--folder', help='folder of the tree. A temporary folder is used and removed when not set.')
+    parser.add_argument('--python', default=os.path.join(tree.ROOT, 'python'), help='python folder of the ovfx version to measure')
+    parser.add_argument('--output', help='YAML file to write the results to')
+    parser.add_argument('--baseline', help='YAML file of previous results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1, help='slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    sys.path.insert(0, args.python)
+    current = run(args.projects, args.shots, args.frames, args.number, args.folder)
+    if args.output:
+        with open(args.output, 'w') as f:
+            yaml.safe_dump(current, f, default_flow_style=False)
+
+    if not args.baseline:
+        print('{:<28}{:>14}'.format('Call', 'Current (us)'))
+        for name, value in current['results'].items():
+            print('{:<28}{:>14.2f}'.format(name, value))
+        return
+
+    with open(args.baseline) as f:
+        baseline = yaml.safe_load(f)
+    if baseline.get('scale') != current['scale']:
+        print('Warning: the baseline was measured with another scale {}'.format(baseline.get('scale')))
+    regressions = 0
+    print('{:<28}{:>14}{:>14}{:>10}'.format('Call', 'Baseline (us)', 'Current (us)', 'Ratio'))
+    for name, base, value, ratio, regression in compare(current, baseline, args.threshold):
+        regressions += regression
+        print('{:<28}{:>14.2f}{:>14.2f}{:>9.2f}x{}'.format(name, base, value, ratio, '  REGRESSION' if regression else ''))
+    if regressions:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
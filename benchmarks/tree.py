@@ -0,0 +1,126 @@
+"""
+Generate synthetic studio trees and path lists from the sample configs.
+
+The sample location models are rooted in /mnt. A copy of the configs is written in a
+temporary folder with /mnt replaced by that folder, so the generated files exist on disk
+and match the models exactly like a real production tree.
+
+The values are generated without ovfx so the same tree can be measured with any
+version of the framework.
+
+Examples:
+    python -m benchmarks.tree /tmp/studio --projects 2 --shots 20 --frames 100
+"""
+import argparse
+import os
+import shutil
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_CONFIG = os.path.join(ROOT, 'samples', 'config')
+MODEL = ['software', 'render', 'image', 'shot']
+TARGET_MODEL = ['publish', 'render', 'image', 'shot']
+
+def create_config(folder):
+    """
+    Write the sample configs in folder/config with the /mnt root replaced by folder/mnt.
+
+    Returns:
+        The config folder to use as OVFX_CONFIG_DIR
+    """
+    config_dir = os.path.join(folder, 'config')
+    if not os.path.isdir(config_dir):
+        os.makedirs(config_dir)
+    shutil.copy(os.path.join(SAMPLE_CONFIG, 'fragment.yaml'), config_dir)
+    with open(os.path.join(SAMPLE_CONFIG, 'location.yaml')) as f:
+        location = yaml.safe_load(f)
+    with open(os.path.join(config_dir, 'location.yaml'), 'w') as f:
+        yaml.safe_dump(_reroot(location, os.path.join(folder, 'mnt')), f)
+    return config_dir
+
+def _reroot(config, root):
+    if isinstance(config, dict):
+        return dict((key, _reroot(value, root)) for key, value in config.items())
+    if config and config.startswith('/mnt/'):
+        return root + config[4:]
+    return config
+
+def model(folder, keys=MODEL):
+    """Return a location model of the config written by create_config"""
+    with open(os.path.join(folder, 'config', 'location.yaml')) as f:
+        result = yaml.safe_load(f)
+    for key in keys:
+        result = result[key]
+    return result
+
+def _name(index):
+    """Return a name made of letters only since the project regex does not allow digits"""
+    result = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        result = chr(ord('A') + remainder) + result
+    return result
+
+def contexts(projects=2, shots=10, frames=100, elements=('fire', 'smoke'), first_frame=1001):
+    """
+    Return a generator of the fragment values of each frame of the tree.
+
+    Each project has a single episode. The shots are spread over sequences of 10 shots.
+    """
+    for p in range(projects):
+        for s in range(shots):
+            for elem in elements:
+                base = {'proj': 'Proj{}'.format(_name(p)), 'epis': 'E100', 'seq': 'Seq_{:03d}'.format(s // 10 * 10 + 10),
+                        'shot': '{:04d}'.format(s % 10 * 10 + 10), 'soft': 'houdini', 'task': 'fx', 'elem': elem,
+                        'ver': '001', 'ext': 'exr'}
+                for f in range(frames):
+                    values = dict(base)
+                    values['frame'] = '.{}'.format(first_frame + f)
+                    yield values
+
+def fill(model, values):
+    """Replace the tags of a model with their values"""
+    for id, value in values.items():
+        model = model.replace('<{}>'.format(id), value)
+    return model
+
+def paths(model, **kwargs):
+    """Return the list of paths of the tree for a model. See contexts() for the arguments."""
+    return [fill(model, values) for values in contexts(**kwargs)]
+
+def generate(folder, **kwargs):
+    """
+    Create the configs and empty frame files of a synthetic tree in folder.
+
+    See contexts() for the arguments.
+
+    Returns:
+        A (config folder, list of files) tuple
+    """
+    config_dir = create_config(folder)
+    files = paths(model(folder), **kwargs)
+    created = set()
+    for path in files:
+        directory = os.path.dirname(path)
+        if directory not in created:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            created.add(directory)
+        with open(path, 'wb') as f:
+            f.write(b'\0' * 1024)
+    return config_dir, files
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('folder', help='folder of the tree')
+    parser.add_argument('--projects', type=int, default=2)
+    parser.add_argument('--shots', type=int, default=10, help='number of shots per project')
+    parser.add_argument('--frames', type=int, default=100, help='number of frames per element')
+    args = parser.parse_args()
+    config_dir, files = generate(args.folder, projects=args.projects, shots=args.shots, frames=args.frames)
+    print('{} files created. Use OVFX_CONFIG_DIR={}'.format(len(files), config_dir))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+"""
+Run the command line interface with python -m ovfx. See ovfx.cli.
+"""
+import sys
+
+from ovfx import cli
+
+sys.exit(cli.main())
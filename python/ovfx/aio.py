@@ -0,0 +1,119 @@
+"""
+asyncio support for the blocking file system calls.
+
+Interactive tools like browsers run an event loop and cannot wait for a slow network
+mount. The async methods of ovfx.path.Path, ovfx.path.Seq and ovfx.loc.Location run
+their blocking counterpart on a bounded pool of threads shared by the whole process.
+
+The listings are streamed: the blocking generator is read by chunks in the pool so the
+first results are available before the whole directory is read.
+
+A cancelled or timed out call stops waiting right away. The blocking call running in
+the pool cannot be interrupted, it finishes in the background and its result is dropped.
+The streamed listings stop at the end of the current chunk.
+
+Examples:
+    import asyncio
+    import ovfx.path
+
+    async def thumbnails(folder):
+        async for path in ovfx.path.Path(folder).aiterdir('*.exr', timeout=5):
+            print(path.name())
+
+    asyncio.run(thumbnails('/mnt/prod/projects/MyProject/E300/010/library/hdri/car'))
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import itertools
+import os
+import threading
+
+_executor = None
+_workers = int(os.getenv('OVFX_AIO_WORKERS', '8'))
+_lock = threading.Lock()
+
+def executor():
+    """Return the pool of threads running the blocking calls"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(max_workers=_workers, thread_name_prefix='ovfx_aio')
+        return _executor
+
+def set_workers(workers):
+    """
+    Set the maximum number of blocking calls running at the same time.
+
+    It can also be set with the OVFX_AIO_WORKERS variable. The running calls finish in the previous pool.
+    """
+    global _executor, _workers
+    with _lock:
+        previous = _executor
+        _executor = None
+        _workers = workers
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+async def run(func, *args, timeout=None, **kwargs):
+    """
+    Run a blocking function in the pool and return its result.
+
+    Args:
+        timeout  : Number of seconds to wait for the result. No limit when None.
+
+    Raises:
+        asyncio.TimeoutError : When the timeout is reached
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(executor(), functools.partial(func, *args, **kwargs))
+    if timeout is None:
+        return await future
+    return await asyncio.wait_for(future, timeout)
+
+async def iterate(factory, chunk_size=64, timeout=None, cancel=None):
+    """
+    Return an async generator of the items of a blocking generator.
+
+    The generator is created and read in the pool, chunk_size items at a time.
+
+    Args:
+        factory     : Function returning the blocking generator. It is called in the pool.
+        chunk_size  : Number of items read from the generator per call in the pool
+        timeout     : Number of seconds to wait for each chunk. No limit when None.
+        cancel      : Optional threading.Event set when the async generator stops before the end.
+                      Eg. to stop a Location.glob search.
+
+    Raises:
+        asyncio.TimeoutError : When the timeout is reached for a chunk
+    """
+    generator = None
+    complete = False
+    lock = threading.Lock() # A chunk may still be read in the pool after a timeout
+
+    def next_chunk():
+        nonlocal generator
+        with lock:
+            if generator is None:
+                generator = iter(factory())
+            return list(itertools.islice(generator, chunk_size))
+
+    def close():
+        with lock:
+            if generator is not None and hasattr(generator, 'close'):
+                generator.close()
+
+    try:
+        while True:
+            chunk = await run(next_chunk, timeout=timeout)
+            for item in chunk:
+                yield item
+            if len(chunk) < chunk_size:
+                complete = True
+                return
+    finally:
+        if not complete:
+            if cancel is not None:
+                cancel.set()
+            executor().submit(close)
@@ -0,0 +1,282 @@
+"""
+Incremental archiving of a project.
+
+A manifest of every archived file is kept with its relative path, size, modification
+time and an optional hash. On each run the source tree is compared with the manifest
+and only the new or changed files are copied, concurrently. The deleted files are
+reported and can be removed from the archive. The symbolic links are archived as links,
+they are never followed.
+
+The source tree is walked in sorted order and the manifest is a sorted text file so
+both are compared as two streams. Nothing proportional to the number of files is kept
+in memory, which matters for projects with tens of millions of files.
+"""
+
+import collections
+import gzip
+import hashlib
+import os
+import re
+import threading
+import concurrent.futures
+
+import ovfx.loc
+import ovfx.publish
+from ovfx import stats
+
+NEW = 'new'
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+DELETED = 'deleted'
+FAILED = 'failed'
+
+MANIFEST_NAME = '.ovfx_manifest.tsv'
+
+class Archiver(object):
+
+    def __init__(self, source_root, target_root, manifest=None, workers=8, hash=False):
+        """
+        Args:
+            source_root  : Folder to archive
+            target_root  : Archive folder
+            manifest     : Manifest file. It is saved in the archive folder when None.
+                           A name ending with .gz is compressed.
+            workers      : Maximum number of files copied at the same time
+            hash         : Store the sha1 of the new and changed files in the manifest
+        """
+        self.__source_root = source_root.rstrip('/')
+        self.__target_root = target_root.rstrip('/')
+        self.__manifest = manifest or os.path.join(self.__target_root, MANIFEST_NAME)
+        self.__workers = workers
+        self.__hash = hash
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} object from {} to {} at {}>'.format(cl.__module__, cl.__name__, self.__source_root, self.__target_root, hex(id(self)))
+        return result
+
+    @classmethod
+    def from_project(cls, proj, source=('project',), target=('project_archive',), **kwargs):
+        """
+        Create an Archiver from the project root and the project archive root location models
+
+        Examples:
+            import ovfx.archive
+            archiver = ovfx.archive.Archiver.from_project('MyProject')
+            print(archiver.run(prune=True))
+        """
+        source_root = ovfx.loc.Location(list(source)).path(proj=proj)
+        target_root = ovfx.loc.Location(list(target)).path(proj=proj)
+        return cls(source_root, target_root, **kwargs)
+
+    def manifest(self):
+        return self.__manifest
+
+    def run(self, prune=False, dry_run=False, callback=None):
+        """
+        Copy the new and changed files to the archive and update the manifest.
+
+        A file which cannot be copied does not stop the run. It is reported as FAILED and
+        keeps its previous manifest entry, if any, so the next run copies it again.
+
+        Args:
+            prune     : Remove the deleted files from the archive. Otherwise they are only reported.
+            dry_run   : Only report the changes. Nothing is copied or removed and the manifest is not updated.
+            callback  : Optional function called with (status, relative path) for each new, changed, deleted
+                        or failed file. The failed files are reported from the main thread too.
+
+        Returns:
+            A dictionary with the number of files per status, FAILED included, and the number of bytes copied.
+        """
+        summary = {NEW: 0, CHANGED: 0, UNCHANGED: 0, DELETED: 0, FAILED: 0, 'bytes': 0}
+        slots = threading.BoundedSemaphore(self.__workers * 4) # Limit the pending copies to keep the memory flat
+        temp_manifest = '{}.{}.tmp'.format(self.__manifest, os.getpid())
+        if not dry_run and not os.path.isdir(os.path.dirname(os.path.abspath(self.__manifest))):
+            os.makedirs(os.path.dirname(os.path.abspath(self.__manifest)))
+
+        # The manifest entries waiting for the hash computed by their copy, in manifest order
+        pending = collections.deque()
+        max_pending = self.__workers * 64
+
+        def done(future):
+            slots.release()
+
+        def flush(wait=False):
+            while pending:
+                entry, future, old = pending[0]
+                if future is not None:
+                    if not wait and not future.done():
+                        return
+                    concurrent.futures.wait([future])
+                    if future.exception() is not None:
+                        summary[FAILED] += 1
+                        if callback is not None:
+                            callback(FAILED, entry[0])
+                        entry = old # Copied again by the next run
+                    elif self.__hash:
+                        entry = entry[:3] + (future.result(),)
+                pending.popleft()
+                if entry is not None and writer is not None:
+                    writer.write(_format(entry))
+
+        try:
+            writer = _open(temp_manifest, 'w') if not dry_run else None
+            copy = self.__copy if not stats.enabled else stats.bind(self.__copy)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.__workers) as executor:
+                for status, old, new in _compare(read_manifest(self.__manifest), self.__scan()):
+                    summary[status] += 1
+                    if status == DELETED:
+                        if callback is not None:
+                            callback(status, old[0])
+                        if prune and not dry_run:
+                            target = os.path.join(self.__target_root, old[0])
+                            if os.path.lexists(target) if not stats.enabled else stats.call('fs.stat', os.path.lexists, target):
+                                os.remove(target)
+                        continue
+                    entry = new
+                    future = None
+                    if status == UNCHANGED:
+                        entry = new[:3] + (old[3],) # Keep the hash of the previous run
+                    else:
+                        if callback is not None:
+                            callback(status, new[0])
+                        summary['bytes'] += new[1]
+                        if not dry_run:
+                            slots.acquire()
+                            future = executor.submit(copy, new[0])
+                            future.add_done_callback(done)
+                    if future is not None or writer is not None:
+                        pending.append((entry, future, old))
+                        if len(pending) > max_pending: # Wait for the oldest copy holding back the entries
+                            concurrent.futures.wait([pending[0][1]])
+                        flush()
+                flush(wait=True)
+            if writer is not None:
+                writer.close()
+                writer = None
+                os.replace(temp_manifest, self.__manifest)
+        finally:
+            if not dry_run:
+                if writer is not None:
+                    writer.close()
+                if os.path.exists(temp_manifest):
+                    os.remove(temp_manifest)
+        return summary
+
+    def __copy(self, relative_path):
+        """
+        Copy a file to the archive. Return its sha1 when hashing, computed in the worker thread.
+
+        A symbolic link is created again with the same target, even a dangling one or a link to a folder.
+        Its hash is empty.
+        """
+        source = os.path.join(self.__source_root, relative_path)
+        target = os.path.join(self.__target_root, relative_path)
+        folder = os.path.dirname(target)
+        if not os.path.isdir(folder):
+            os.makedirs(folder, exist_ok=True)
+        if os.path.islink(source) if not stats.enabled else stats.call('fs.stat', os.path.islink, source):
+            _copy_link(source, target)
+            return ''
+        digest = _sha1(source) if self.__hash else None
+        ovfx.publish.copy_file(source, target)
+        return digest
+
+    def __scan(self):
+        """Yield a (relative path, size, mtime, hash) entry for every file of the source in manifest order"""
+        exclude = os.path.abspath(self.__target_root)
+        stack = ['']
+        while stack:
+            relative_dir = stack.pop()
+            directory = os.path.join(self.__source_root, relative_dir) if relative_dir else self.__source_root
+            if os.path.abspath(directory) == exclude: # Never archive the archive itself
+                continue
+            try:
+                with (os.scandir(directory) if not stats.enabled else stats.call('fs.listdir', os.scandir, directory)) as iterator:
+                    entries = sorted(iterator, key=lambda entry: entry.name)
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                continue
+            # A folder is listed entirely before its sub folders to follow the manifest order.
+            # The sub folders are pushed on the stack in reverse order so they are popped in order.
+            sub_dirs = []
+            for entry in entries:
+                relative_path = '{}/{}'.format(relative_dir, entry.name) if relative_dir else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        sub_dirs.append(relative_path)
+                    else:
+                        stat = entry.stat(follow_symlinks=False) if not stats.enabled else stats.call('fs.stat', entry.stat, follow_symlinks=False)
+                        yield (relative_path, stat.st_size, stat.st_mtime_ns, '')
+                except OSError: # Deleted while scanning
+                    pass
+            stack.extend(reversed(sub_dirs))
+
+def _copy_link(source, target):
+    """Create the link atomically, like publish.copy_file does for the files"""
+    temp = os.path.join(os.path.dirname(target), '.{}.{}.tmp'.format(os.path.basename(target), os.getpid()))
+    if os.path.lexists(temp):
+        os.remove(temp)
+    os.symlink(os.readlink(source), temp)
+    try:
+        os.replace(temp, target)
+    except OSError:
+        os.remove(temp)
+        raise
+
+def read_manifest(path):
+    """Yield the (relative path, size, mtime, hash) entries of a manifest. Nothing when it does not exist."""
+    if not os.path.exists(path):
+        return
+    with _open(path, 'r') as f:
+        for line in f:
+            relative_path, size, mtime, hash = line.rstrip('\n').split('\t')
+            yield (_unescape(relative_path), int(size), int(mtime), hash)
+
+def _compare(old_entries, new_entries):
+    """Merge two sorted streams of entries and yield (status, old entry, new entry)"""
+    old = next(old_entries, None)
+    new = next(new_entries, None)
+    while old is not None or new is not None:
+        old_key = _sort_key(old[0]) if old is not None else None
+        new_key = _sort_key(new[0]) if new is not None else None
+        if new is None or (old is not None and old_key < new_key):
+            yield DELETED, old, None
+            old = next(old_entries, None)
+        elif old is None or new_key < old_key:
+            yield NEW, None, new
+            new = next(new_entries, None)
+        else:
+            status = UNCHANGED if old[1:3] == new[1:3] else CHANGED
+            yield status, old, new
+            old = next(old_entries, None)
+            new = next(new_entries, None)
+
+def _sort_key(relative_path):
+    """Files are sorted by their folder names first, in the order the source is scanned"""
+    parts = relative_path.split('/')
+    return (parts[:-1], 1, parts[-1])
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', errors='surrogateescape')
+    return open(path, mode, encoding='utf-8', errors='surrogateescape')
+
+def _format(entry):
+    return '{}\t{}\t{}\t{}\n'.format(_escape(entry[0]), entry[1], entry[2], entry[3])
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+_UNESCAPE_REGEX = re.compile(r'\\(.)')
+_UNESCAPES = {'n': '\n', 't': '\t', '\\': '\\'}
+
+def _unescape(value):
+    # A single pass from left to right so an escaped backslash is never read as the start of another escape
+    return _UNESCAPE_REGEX.sub(lambda match: _UNESCAPES.get(match.group(1), match.group(0)), value) if '\\' in value else value
+
+def _sha1(path):
+    result = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            result.update(chunk)
+    return result.hexdigest()
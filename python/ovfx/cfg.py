@@ -1,31 +1,267 @@
-
+import hashlib
+import marshal
 import os
-import yaml
+import threading
+import time
+
+from ovfx import stats
 
 # from ovfx import exceptions as ex
 
-def config(name):
+# Increment when the content of the cache files changes
+CACHE_VERSION = 1
+
+def config(name, use_cache=True):
     """
     Get the content of the setup configuration file.
 
     The config files are all in the same standard location.
 
+    The parsed content is saved in a cache file next to the config file. As long as the
+    config file keeps the same path, modification time and size, the cache is used
+    and the yaml file is not parsed again. See cache_dir() for the cache location.
+
     Args:
-        name     : Name of the file without the .yaml extension
+        name      : Name of the file without the .yaml extension
+        use_cache : Read and write the cache file. Otherwise always parse the yaml file.
 
     Examples:
         import ovfx.cfg
         loc = ovfx.cfg.config('location')
     """
+    return _load(name, use_cache)[0]
+
+def compiled(name, use_cache=True):
+    """
+    Get the pre-computed form of a configuration file. It is stored in the cache with the content.
+
+    For the location config it is a dictionary with the flattened model table under 'models'.
+    See models().
+    """
+    return _load(name, use_cache)[1]
+
+def models():
+    """
+    Return a (keys, model) pair for each model of the location config.
+
+    The keys is the tuple of keys leading to the model in the nested config. Empty models are skipped.
+
+    Examples:
+        import ovfx.cfg
+        for keys, model in ovfx.cfg.models():
+            print('/'.join(keys), model)
+    """
+    return current().models()
+
+class Config(object):
+    """
+    One generation of the fragment and location configs.
+
+    A Config object is never modified. When the config files change, a new generation
+    replaces it as the current one so the objects holding the previous one keep a
+    consistent view of the configuration.
+    """
+
+    def __init__(self, generation, fragment, location, models, signature):
+        self.__generation = generation
+        self.__fragment = fragment
+        self.__location = location
+        self.__models = models
+        self.__signature = signature
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} object "Generation={}" at {}>'.format(cl.__module__, cl.__name__, self.__generation, hex(id(self)))
+        return result
+
+    def generation(self):
+        return self.__generation
+
+    def fragment(self):
+        return self.__fragment
+
+    def location(self):
+        return self.__location
+
+    def models(self):
+        return self.__models
+
+    def signature(self):
+        """Return the (path, mtime, size) of each config file when this generation was loaded"""
+        return self.__signature
+
+_current = None
+_lock = threading.RLock()
+_listeners = []
+_poll_interval = float(os.getenv('OVFX_CONFIG_POLL')) if os.getenv('OVFX_CONFIG_POLL') else None
+_last_check = 0.0
+
+def current():
+    """
+    Return the current Config generation. Load it on the first call.
+
+    When a poll interval is set, the config files are checked for changes at most
+    once per interval and a new generation is loaded when they changed.
+    See set_poll_interval().
+    """
+    config = _current
+    if config is None:
+        # Only the first of the threads arriving at the same time loads it
+        with _lock:
+            if _current is None:
+                return reload()
+            config = _current
+    if _poll_interval is not None and time.time() - _last_check >= _poll_interval:
+        return check()
+    return config
+
+def check():
+    """
+    Compare the config files with the current generation and reload them if they changed.
+
+    It only costs a stat per config file. Return the current Config generation.
+    """
+    global _last_check
+    _last_check = time.time()
+    config = _current
+    if config is None or _signature() != config.signature():
+        config = reload(config)
+    return config
+
+def reload(expected=None):
+    """
+    Load a new Config generation and make it the current one.
+
+    The callbacks registered with on_reload() are called with the old and new generations
+    so they can invalidate anything derived from the old one.
+
+    Args:
+        expected : Only reload when the current generation is still this one. Another thread may have already reloaded it.
+    """
+    global _current, _last_check
+    with _lock:
+        old = _current
+        if old is not None and expected is not None and old is not expected:
+            return old
+        signature = _signature()
+        fragment = _load('fragment', True)[0]
+        location, compiled_location = _load('location', True)
+        generation = old.generation() + 1 if old is not None else 1
+        new = Config(generation, fragment, location, compiled_location['models'], signature)
+        _current = new
+        _last_check = time.time()
+        if old is not None:
+            for callback in list(_listeners):
+                callback(old, new)
+        return new
+
+def on_reload(callback):
+    """Register a function called with the (old, new) Config generations after a reload"""
+    _listeners.append(callback)
+
+def set_poll_interval(seconds):
+    """
+    Set how often current() checks the config files for changes.
+
+    None disables the checks, which is the default unless the OVFX_CONFIG_POLL variable is set.
+    Long running tools like browsers or daemons can use a few seconds to pick up config changes without restarting.
+    """
+    global _poll_interval
+    _poll_interval = seconds
+
+def _signature():
+    result = []
+    for name in ('fragment', 'location'):
+        config_path = '{}/{}.yaml'.format(os.getenv('OVFX_CONFIG_DIR'), name)
+        try:
+            stat = os.stat(config_path)
+            result.append((os.path.abspath(config_path), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            result.append((os.path.abspath(config_path), None, None))
+    return tuple(result)
+
+def cache_dir():
+    """
+    Return the folder of the cache files.
 
+    It is the OVFX_CACHE_DIR variable when set, otherwise the .ovfx_cache folder inside OVFX_CONFIG_DIR.
+    Set OVFX_CONFIG_CACHE=0 to disable the cache completely.
+    """
+    return os.getenv('OVFX_CACHE_DIR') or os.path.join('{}'.format(os.getenv('OVFX_CONFIG_DIR')), '.ovfx_cache')
+
+def _load(name, use_cache):
+    """Return the (data, compiled) pair of a config file, from the cache when it is up to date"""
+    if stats.enabled:
+        with stats.timer('config.load'):
+            return _load_file(name, use_cache)
+    return _load_file(name, use_cache)
+
+def _load_file(name, use_cache):
     config_path = '{}/{}.yaml'.format(os.getenv('OVFX_CONFIG_DIR'), name)
     if not os.path.exists(config_path):
         raise IOError('The following configuration file does not exist: {} Make sure the OVFX_CONFIG_DIR variable is set.'.format(config_path))
+    stat = os.stat(config_path)
+    key = (CACHE_VERSION, os.path.abspath(config_path), stat.st_mtime_ns, stat.st_size)
+    use_cache = use_cache and os.getenv('OVFX_CONFIG_CACHE', '1') != '0'
+    # A shared cache folder holds one file per config folder
+    digest = hashlib.md5(os.path.dirname(key[1]).encode('utf-8')).hexdigest()[:12]
+    cache_path = os.path.join(cache_dir(), '{}-{}.marshal'.format(name, digest))
+
+    if use_cache:
+        try:
+            with open(cache_path, 'rb') as f:
+                cached = marshal.load(f)
+            if cached[0] == key:
+                return cached[1], cached[2]
+        except (OSError, EOFError, ValueError, TypeError, IndexError):
+            pass # Missing, outdated or corrupted cache. Parse the yaml file instead.
+
+    # Only import yaml when needed. It is slow to import and not needed with an up to date cache.
+    import yaml
     with open(config_path) as f:
         # Used to be the following but when existing yaml library are too old it errors out
         # data = yaml.load(f, Loader=yaml.FullLoader)
         data = yaml.safe_load(f)
-    return data
+    result = (data, _compile(name, data))
+
+    if use_cache:
+        # Write to a temp file first so another process never reads a partial cache file
+        temp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+        try:
+            if not os.path.isdir(os.path.dirname(cache_path)):
+                os.makedirs(os.path.dirname(cache_path))
+            with open(temp_path, 'wb') as f:
+                marshal.dump((key, result[0], result[1]), f)
+            os.replace(temp_path, cache_path)
+        except (OSError, ValueError): # Read only config folder or data that cannot be cached. Not an error.
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    return result
+
+def _compile(name, data):
+    """Return the pre-computed form of a config content"""
+    result = {}
+    if name == 'location':
+        result['models'] = list(_flatten(data or {}))
+    return result
+
+def _flatten(config, keys=()):
+    for key in config:
+        value = config[key]
+        if isinstance(value, dict):
+            for result in _flatten(value, keys + (key,)):
+                yield result
+        elif value:
+            yield keys + (key,), value
 
-fragment = config('fragment')
-location = config('location')
+def __getattr__(name):
+    """
+    Return the fragment and location configs of the current generation.
+
+    They are loaded on first access instead of at import time.
+    """
+    if name == 'fragment':
+        return current().fragment()
+    elif name == 'location':
+        return current().location()
+    raise AttributeError('module {} has no attribute {}'.format(__name__, name))
@@ -0,0 +1,160 @@
+"""
+Command line interface of the framework.
+
+Read paths from files or stdin, one per line, and write their context or their
+translated path as NDJSON or TSV. The lines are processed by chunks as they are read
+so millions of paths use a constant amount of memory. With --jobs the chunks are
+spread over a pool of processes and written in the input order.
+
+The models are the keys of location.yaml joined with slashes. Eg. software/render/image/shot
+
+Examples:
+    find /mnt/prod/projects/MyProject -name '*.exr' | python -m ovfx extract software/render/image/shot --format tsv
+    python -m ovfx translate software/render/image/shot publish/render/image/shot renders.txt --set ver=044
+    python -m ovfx classify --exact --jobs 8 < paths.txt
+"""
+
+import argparse
+import collections
+import itertools
+import json
+import sys
+
+def _read(files, chunk_size):
+    """Return a generator of lists of at most chunk_size paths read from the files. - is stdin."""
+    def lines():
+        for name in files or ['-']:
+            stream = sys.stdin if name == '-' else open(name)
+            try:
+                for line in stream:
+                    line = line.rstrip('\r\n')
+                    if line:
+                        yield line
+            finally:
+                if stream is not sys.stdin:
+                    stream.close()
+    iterator = lines()
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def _extract(args, paths):
+    import ovfx.service
+    return list(zip(paths, ovfx.service.extract(args['model'], paths)))
+
+def _translate(args, paths):
+    import ovfx.service
+    return list(zip(paths, ovfx.service.translate(args['source'], args['target'], paths, args['values'])))
+
+def _classify(args, paths):
+    import ovfx.service
+    return list(zip(paths, ovfx.service.classify(paths, args['exact'], args['models'])))
+
+def _evaluate(task):
+    """Run in the pool processes"""
+    name, args, paths = task
+    return _COMMANDS[name](args, paths)
+
+_COMMANDS = {
+    'extract': _extract,
+    'translate': _translate,
+    'classify': _classify,
+}
+
+def _results(name, args, chunks, jobs):
+    """Return a generator of the result lists of each chunk in the input order"""
+    if jobs <= 1:
+        for paths in chunks:
+            yield _COMMANDS[name](args, paths)
+        return
+    import multiprocessing
+    with multiprocessing.Pool(jobs) as pool:
+        # Only a few chunks per process are pending so the memory does not grow with the input
+        pending = collections.deque()
+        for paths in chunks:
+            pending.append(pool.apply_async(_evaluate, ((name, args, paths),)))
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+def _format(name, args, result, output_format, tags):
+    """Return the output line of a (path, result) pair"""
+    path, value = result
+    if output_format == 'ndjson':
+        if name == 'extract':
+            record = {'path': path, 'context': value}
+        elif name == 'translate':
+            record = {'path': path, 'target': value}
+        else:
+            record = {'path': path, 'matches': [{'model': '/'.join(keys), 'context': context} for keys, context in value]}
+        return json.dumps(record)
+    if name == 'extract':
+        return '\t'.join([path] + [(value or {}).get(tag) or '' for tag in tags])
+    if name == 'translate':
+        return '{}\t{}'.format(path, value or '')
+    return '{}\t{}'.format(path, '/'.join(value[0][0]) if value else '')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ovfx', description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command')
+    extract = subparsers.add_parser('extract', help='write the context of each path')
+    extract.add_argument('model', help='location model keys. Eg. software/render/image/shot')
+    translate = subparsers.add_parser('translate', help='write the path of the target model of each path')
+    translate.add_argument('source', help='location model keys of the input paths')
+    translate.add_argument('target', help='location model keys of the output paths')
+    translate.add_argument('--set', action='append', default=[], metavar='ID=VALUE', help='fragment value overriding the extracted one. Can be repeated.')
+    classify = subparsers.add_parser('classify', help='write the models matching each path')
+    classify.add_argument('--exact', action='store_true', help='the whole path must match the model')
+    classify.add_argument('--model', action='append', dest='models', metavar='MODEL', help='limit to this model. Can be repeated.')
+    for subparser in (extract, translate, classify):
+        subparser.add_argument('files', nargs='*', help='files with one path per line. stdin when none or -')
+        subparser.add_argument('--format', choices=('ndjson', 'tsv'), default='ndjson', help='output format (default: ndjson)')
+        subparser.add_argument('--jobs', type=int, default=1, help='number of processes (default: 1)')
+        subparser.add_argument('--chunk-size', type=int, default=2000, help='number of paths per chunk (default: 2000)')
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+
+    if args.command == 'extract':
+        command_args = {'model': args.model}
+    elif args.command == 'translate':
+        values = {}
+        for item in args.set:
+            if '=' not in item:
+                parser.error('--set expects ID=VALUE: {}'.format(item))
+            key, value = item.split('=', 1)
+            values[key] = value
+        command_args = {'source': args.source, 'target': args.target, 'values': values}
+    else:
+        command_args = {'exact': args.exact, 'models': args.models}
+
+    tags = []
+    try:
+        if args.command == 'extract':
+            import ovfx.loc
+            import ovfx.service
+            # The TSV columns are the tags of the model in order of first occurrence
+            tags = list(collections.OrderedDict.fromkeys(ovfx.loc.Location(ovfx.service.keys(args.model)).tags()))
+            if args.format == 'tsv':
+                sys.stdout.write('\t'.join(['path'] + tags) + '\n')
+        write = sys.stdout.write
+        for results in _results(args.command, command_args, _read(args.files, args.chunk_size), args.jobs):
+            write(''.join(_format(args.command, command_args, result, args.format, tags) + '\n' for result in results))
+        sys.stdout.flush()
+    except BrokenPipeError: # Eg. piped to head
+        sys.stderr.close()
+        return 0
+    except KeyError as error:
+        sys.stderr.write('ovfx: unknown location model key {}\n'.format(error))
+        return 2
+    except Exception as error:
+        from ovfx import exceptions as ex
+        if not isinstance(error, (ex.OvfxError, OSError)):
+            raise
+        sys.stderr.write('ovfx: {}\n'.format(error))
+        return 1
+    return 0
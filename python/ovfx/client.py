@@ -0,0 +1,177 @@
+"""
+Thin client of the ovfx daemon.
+
+Short lived processes like farm tasks only need a few paths translated. Importing
+ovfx.loc and loading the configs costs more than the translation itself. This module
+only imports the standard library and sends the requests to the ovfx daemon which
+keeps everything warm in memory. See ovfx.daemon.
+
+When no daemon is running for the config folder, the requests are evaluated in the
+process with ovfx.service, so the tools work the same with or without the daemon.
+
+Every call takes a list of paths or contexts and returns a list of results so a task
+sends all its paths in a single round trip.
+
+Examples:
+    import ovfx.client
+    targets = ovfx.client.translate('software/render/image/shot', 'publish/render/image/shot',
+                                    ['/mnt/prod/projects/MyProject/E400/Seq_010/0010/3D/houdini/render/fx_fire/v043/MyProject_E400_Seq_010_0010_fx_fire_v043.1001.tif'])
+"""
+
+import hashlib
+import json
+import os
+import socket
+import threading
+
+from ovfx import exceptions as ex
+
+def socket_path():
+    """
+    Return the socket of the daemon serving the current config folder.
+
+    It is the OVFX_DAEMON_SOCKET variable when set. Otherwise each user and config
+    folder has its own socket in the temp folder so a daemon never answers with another config.
+    """
+    path = os.getenv('OVFX_DAEMON_SOCKET')
+    if path:
+        return path
+    config_dir = os.path.abspath('{}'.format(os.getenv('OVFX_CONFIG_DIR')))
+    digest = hashlib.md5(config_dir.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(os.getenv('TMPDIR') or '/tmp', 'ovfx-{}-{}.sock'.format(os.getuid(), digest))
+
+class Client(object):
+
+    def __init__(self, path=None, fallback=True, timeout=30.0):
+        """
+        Args:
+            path      : Socket of the daemon. See socket_path() when None.
+            fallback  : Evaluate the requests in the process when the daemon is not running.
+                        Otherwise raise ConnectionError.
+            timeout   : Number of seconds to wait for the daemon to answer
+        """
+        self.__path = path or socket_path()
+        self.__fallback = fallback
+        self.__timeout = timeout
+        self.__socket = None
+        self.__file = None
+        self.__next_id = 0
+        self.__lock = threading.Lock()
+
+    def __repr__(self):
+        cl = self.__class__
+        status = 'connected' if self.__socket is not None else 'not connected'
+        result = '<{}.{} object {} to {} at {}>'.format(cl.__module__, cl.__name__, status, self.__path, hex(id(self)))
+        return result
+
+    def connected(self):
+        """Return whether the requests go to the daemon. Try to connect when not connected yet."""
+        return self.__connect()
+
+    def close(self):
+        if self.__socket is not None:
+            self.__file.close()
+            self.__socket.close()
+            self.__socket = None
+            self.__file = None
+
+    def __connect(self):
+        if self.__socket is not None:
+            return True
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.__timeout)
+        try:
+            sock.connect(self.__path)
+        except OSError:
+            sock.close()
+            return False
+        self.__socket = sock
+        self.__file = sock.makefile('rwb')
+        return True
+
+    def call_many(self, requests):
+        """
+        Send a list of (operation, arguments dictionary) requests at once and return the list of results.
+
+        The requests are pipelined on the connection so they cost a single round trip.
+
+        Raises:
+            The exception of the first request which failed
+        """
+        requests = list(requests)
+        with self.__lock:
+            if not self.__connect():
+                return self.__local(requests)
+            try:
+                first_id = self.__next_id
+                self.__next_id += len(requests)
+                lines = [json.dumps({'id': first_id + i, 'op': op, 'args': args}).encode('utf-8') + b'\n' for i, (op, args) in enumerate(requests)]
+                self.__file.write(b''.join(lines))
+                self.__file.flush()
+                responses = [json.loads(self.__file.readline()) for request in requests]
+            except (OSError, ValueError):
+                # The daemon stopped or the connection broke. Retry in the process.
+                self.close()
+                return self.__local(requests)
+        result = []
+        for response in responses:
+            if 'error' in response:
+                raise _exception(response['error'], response['message'])
+            result.append(response['result'])
+        return result
+
+    def call(self, op, **args):
+        """Send a single request and return its result"""
+        return self.call_many([(op, args)])[0]
+
+    def __local(self, requests):
+        if not self.__fallback:
+            raise ConnectionError('The ovfx daemon is not running: {}'.format(self.__path))
+        import ovfx.service
+        return [ovfx.service.OPERATIONS[op](**args) for op, args in requests]
+
+    def extract(self, model, paths):
+        """See ovfx.service.extract"""
+        return self.call('extract', model=model, paths=list(paths))
+
+    def translate(self, source, target, paths, values=None):
+        """See ovfx.service.translate"""
+        return self.call('translate', source=source, target=target, paths=list(paths), values=values)
+
+    def path(self, model, contexts):
+        """See ovfx.service.path"""
+        return self.call('path', model=model, contexts=list(contexts))
+
+    def classify(self, paths, exact=False, models=None):
+        """See ovfx.service.classify"""
+        return self.call('classify', paths=list(paths), exact=exact, models=models)
+
+def _exception(name, message):
+    """Return the exception matching the error name sent by the daemon"""
+    error_type = getattr(ex, name, None)
+    if not (isinstance(error_type, type) and issubclass(error_type, ex.OvfxError)):
+        error_type = {'KeyError': KeyError, 'ValueError': ValueError, 'TypeError': TypeError, 'IndexError': IndexError}.get(name, ex.OvfxError)
+    return error_type(message)
+
+_default = None
+_default_lock = threading.Lock()
+
+def default():
+    """Return the Client object shared by the whole process"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Client()
+        return _default
+
+def extract(model, paths):
+    return default().extract(model, paths)
+
+def translate(source, target, paths, values=None):
+    return default().translate(source, target, paths, values)
+
+def path(model, contexts):
+    return default().path(model, contexts)
+
+def classify(paths, exact=False, models=None):
+    return default().classify(paths, exact, models)
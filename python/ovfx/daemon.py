@@ -0,0 +1,109 @@
+"""
+Resident daemon evaluating the location models for short lived processes.
+
+The daemon loads the configs once and keeps the compiled matchers and the Location
+objects in memory. The requests come from ovfx.client over a Unix domain socket, one
+JSON object per line:
+    {"id": 1, "op": "translate", "args": {"source": "...", "target": "...", "paths": [...]}}
+and each one gets a JSON line back with the same id:
+    {"id": 1, "result": [...]}  or  {"id": 1, "error": "InvalidFormat", "message": "..."}
+
+The operations are the functions of ovfx.service. A client can send many requests
+without waiting for the answers, they are answered in order.
+
+The config files are checked for changes every few seconds so the daemon does not need
+a restart when they are edited.
+
+Examples:
+    OVFX_CONFIG_DIR=/studio/config python -m ovfx.daemon &
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+
+import ovfx.cfg
+import ovfx.client
+import ovfx.service
+from ovfx import exceptions as ex
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            response = _answer(line)
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+def _answer(line):
+    request_id = None
+    try:
+        request = json.loads(line)
+        request_id = request.get('id')
+        operation = ovfx.service.OPERATIONS.get(request.get('op'))
+        if operation is None:
+            raise ValueError('Unknown operation: {}'.format(request.get('op')))
+        return {'id': request_id, 'result': operation(**request.get('args', {}))}
+    except Exception as error:
+        return {'id': request_id, 'error': error.__class__.__name__, 'message': str(error)}
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(path=None, poll_interval=2.0):
+    """
+    Run the daemon until interrupted.
+
+    Args:
+        path           : Socket to listen to. See ovfx.client.socket_path() when None.
+        poll_interval  : Number of seconds between the checks of the config files for changes
+
+    Raises:
+        AlreadyExists : When another daemon is already listening to the socket
+    """
+    path = path or ovfx.client.socket_path()
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.remove(path) # Left by a daemon which did not stop cleanly
+        else:
+            raise ex.AlreadyExists('An ovfx daemon is already listening to {}'.format(path))
+        finally:
+            probe.close()
+
+    ovfx.cfg.set_poll_interval(poll_interval)
+    ovfx.cfg.current() # Load the configs before the first request
+    umask = os.umask(0o077) # Only the user can connect
+    try:
+        server = Server(path, _Handler)
+    finally:
+        os.umask(umask)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--socket', help='socket to listen to. Default: {}'.format(ovfx.client.socket_path()))
+    parser.add_argument('--poll', type=float, default=2.0, help='seconds between the checks of the config files for changes')
+    args = parser.parse_args()
+    # Remove the socket when stopped by the system too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        serve(args.socket, args.poll)
+    except ex.AlreadyExists as error:
+        sys.stderr.write('{}\n'.format(error))
+        return 1
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Persistent index of the contexts found on disk.
+
+The paths discovered by ovfx.walk are stored in a local SQLite database along with
+their extracted fragment values, one column per fragment id of the fragment config.
+Tools can then answer questions like "all published fx_fire elements of a project"
+with a query instead of searching the file system again.
+
+The refresh is incremental. The modification time of each directory holding the
+indexed paths is stored. A directory which did not change is not listed again.
+The directories above them are still listed to find new ones.
+"""
+
+import collections
+import os
+import sqlite3
+import threading
+
+import ovfx.cfg
+import ovfx.walk
+from ovfx import stats
+
+class ContextIndex(object):
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path  : Database file. The OVFX_INDEX variable is used when None,
+                    otherwise ~/.ovfx/context_index.sqlite
+        """
+        if path is None:
+            path = os.getenv('OVFX_INDEX') or os.path.join(os.path.expanduser('~'), '.ovfx', 'context_index.sqlite')
+        if path != ':memory:' and not os.path.isdir(os.path.dirname(os.path.abspath(path))):
+            os.makedirs(os.path.dirname(os.path.abspath(path)))
+        self.__path = path
+        self.__connection = sqlite3.connect(path)
+        self.__create_tables()
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} object from {} at {}>'.format(cl.__module__, cl.__name__, self.__path, hex(id(self)))
+        return result
+
+    def __create_tables(self):
+        db = self.__connection
+        with db:
+            db.execute('CREATE TABLE IF NOT EXISTS paths (path TEXT, model TEXT, dir TEXT, PRIMARY KEY (path, model))')
+            db.execute('CREATE TABLE IF NOT EXISTS dirs (dir TEXT, model TEXT, mtime INTEGER, PRIMARY KEY (dir, model))')
+            db.execute('CREATE INDEX IF NOT EXISTS paths_dir ON paths (dir, model)')
+            # One column per fragment. New fragments added to the config are added to the table.
+            existing = set(row[1] for row in db.execute('PRAGMA table_info(paths)'))
+            for id in ovfx.cfg.current().fragment():
+                column = _column(id)
+                if column not in existing:
+                    db.execute('ALTER TABLE paths ADD COLUMN {} TEXT'.format(column))
+                db.execute('CREATE INDEX IF NOT EXISTS paths_{0} ON paths ({0})'.format(column))
+        self.__columns = [row[1] for row in db.execute('PRAGMA table_info(paths)') if row[1].startswith('f_')]
+
+    def path(self):
+        """Return the database file"""
+        return self.__path
+
+    def close(self):
+        self.__connection.close()
+
+    def refresh(self, models=None, workers=8, **values):
+        """
+        Update the index with the paths found on disk for the models.
+
+        The directories which did not change since the last refresh are not listed.
+        The paths which don't exist anymore are removed from the index.
+
+        Args:
+            models   : List of model keys like ['publish', 'render', 'image', 'shot'].
+                       All the models of the location configuration are used when None.
+            workers  : Maximum number of directories listed at the same time
+            values   : Fixed fragment values to limit the refresh. Eg. proj='MyProject'
+
+        Returns:
+            A (added or updated, removed) tuple with the number of paths.
+
+        Examples:
+            import ovfx.index
+            index = ovfx.index.ContextIndex('/tmp/contexts.sqlite')
+            index.refresh([['publish', 'render', 'image', 'shot']], proj='MyProject')
+        """
+        if models is None:
+            models = [keys for keys, model in ovfx.cfg.current().models()]
+        names = ['/'.join(keys) for keys in models]
+        db = self.__connection
+
+        # Known directories of the refreshed scope with their modification time
+        known = {}
+        for dir, model, mtime in self.__select('SELECT DISTINCT d.dir, d.model, d.mtime FROM dirs d JOIN paths p ON p.dir = d.dir AND p.model = d.model', names, values, prefix='p.'):
+            known[(dir, model)] = mtime
+        kept = set()
+        listed = {}
+        lock = threading.Lock()
+
+        def prune(keys, directory):
+            key = (directory, '/'.join(keys))
+            try:
+                mtime = (os.stat(directory) if not stats.enabled else stats.call('fs.stat', os.stat, directory)).st_mtime_ns
+            except OSError:
+                return True
+            with lock:
+                if known.get(key) == mtime:
+                    kept.add(key)
+                    return True
+                listed[key] = mtime
+            return False
+
+        rows = collections.defaultdict(list)
+        for keys, context, path in ovfx.walk.walk(models, workers=workers, prune=prune, **values):
+            model = '/'.join(keys)
+            rows[(os.path.dirname(path), model)].append((path, context))
+
+        added = 0
+        removed = 0
+        with db:
+            # Every directory which was listed or found is replaced by what is on disk now
+            for key in set(rows) | set(listed):
+                found = set(path for path, context in rows.get(key, ()))
+                existing = set(row[0] for row in db.execute('SELECT path FROM paths WHERE dir = ? AND model = ?', key))
+                removed += len(existing - found)
+                db.execute('DELETE FROM paths WHERE dir = ? AND model = ?', key)
+                db.execute('DELETE FROM dirs WHERE dir = ? AND model = ?', key)
+                db.execute('INSERT INTO dirs (dir, model, mtime) VALUES (?, ?, ?)', (key[0], key[1], listed.get(key)))
+                for path, context in rows.get(key, ()):
+                    columns = ['path', 'model', 'dir'] + [_column(id) for id in context]
+                    db.execute('INSERT OR REPLACE INTO paths ({}) VALUES ({})'.format(', '.join(columns), ', '.join('?' * len(columns))),
+                               [path, key[1], key[0]] + list(context.values()))
+                    added += 1
+            # The directories not found anymore are removed
+            for key in known:
+                if key not in kept and key not in listed and key not in rows:
+                    removed += db.execute('DELETE FROM paths WHERE dir = ? AND model = ?', key).rowcount
+                    db.execute('DELETE FROM dirs WHERE dir = ? AND model = ?', key)
+        return added, removed
+
+    def query(self, models=None, limit=None, **values):
+        """
+        Return the indexed paths matching the fragment values.
+
+        Args:
+            models  : List of model keys to limit the search. All the indexed models when None.
+            limit   : Maximum number of paths
+            values  : Fragment values to match. A list or tuple matches any of its values.
+
+        Examples:
+            import ovfx.index
+            index = ovfx.index.ContextIndex()
+            paths = index.query([['publish', 'render', 'image', 'shot']], proj='MyProject', task='fx', elem='fire')
+        """
+        return [path for keys, context, path in self.contexts(models, limit, **values)]
+
+    def contexts(self, models=None, limit=None, **values):
+        """
+        Return a generator of (model keys, context, path) like ovfx.walk.walk but from the index.
+
+        The context only includes the fragments with a value.
+        """
+        names = ['/'.join(keys) for keys in models] if models is not None else None
+        columns = list(self.__columns)
+        query = 'SELECT path, model, {} FROM paths'.format(', '.join(columns))
+        for row in self.__select(query, names, values, order='path', limit=limit):
+            context = collections.OrderedDict((column[2:], value) for column, value in zip(columns, row[2:]) if value is not None)
+            yield tuple(row[1].split('/')), context, row[0]
+
+    def __select(self, query, names, values, prefix='', order=None, limit=None):
+        conditions = []
+        parameters = []
+        if names is not None:
+            conditions.append('{}model IN ({})'.format(prefix, ', '.join('?' * len(names))))
+            parameters.extend(names)
+        for id in values:
+            column = _column(id)
+            if column not in self.__columns:
+                raise KeyError('The following fragment id is not indexed: {}'.format(id))
+            value = values[id]
+            if type(value) in (list, tuple):
+                conditions.append('{}{} IN ({})'.format(prefix, column, ', '.join('?' * len(value))))
+                parameters.extend(value)
+            else:
+                conditions.append('{}{} = ?'.format(prefix, column))
+                parameters.append(value)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        if order:
+            query += ' ORDER BY ' + order
+        if limit is not None:
+            query += ' LIMIT {}'.format(int(limit))
+        return self.__connection.execute(query, parameters)
+
+def _column(id):
+    """Return the column name of a fragment id. The prefix avoids conflicts with the other columns and sql keywords."""
+    return 'f_{}'.format(id)
@@ -0,0 +1,118 @@
+"""
+Cached directory listings.
+
+The drop down menus of the tools list the same few directories over and over: the
+projects, the episodes of a project, the sequences of an episode... On a network file
+system each listing is slow so they are kept in memory with the directory modification
+time.
+
+A cached listing is used without any check for ttl seconds. After that, the directory
+is stat once and listed again only when its modification time changed. A ttl of 0
+always checks the modification time, which is what the calls needing an exact answer
+like Location.latest() use.
+"""
+
+import concurrent.futures
+import os
+import threading
+import time
+
+from ovfx import stats
+
+class ListingCache(object):
+
+    def __init__(self, ttl=5.0, workers=16):
+        """
+        Args:
+            ttl      : Number of seconds a listing is used without checking the directory modification time
+            workers  : Maximum number of directories listed at the same time by map()
+        """
+        self.__ttl = ttl
+        self.__workers = workers
+        self.__executor = None
+        self.__cache = {}
+        self.__lock = threading.Lock()
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} object "ttl={} Cached directories={}" at {}>'.format(cl.__module__, cl.__name__, self.__ttl, len(self.__cache), hex(id(self)))
+        return result
+
+    def ttl(self):
+        return self.__ttl
+
+    def entries(self, directory, ttl=None):
+        """
+        Return the content of a directory as a tuple of (name, is directory) pairs.
+
+        The symbolic links to directories count as directories. A missing directory is empty.
+
+        Args:
+            ttl  : Override the ttl of the cache for this call
+        """
+        ttl = self.__ttl if ttl is None else ttl
+        now = time.monotonic()
+        cached = self.__cache.get(directory)
+        if cached is not None and now < cached[1] + ttl:
+            return cached[2]
+        try:
+            mtime = (os.stat(directory) if not stats.enabled else stats.call('fs.stat', os.stat, directory)).st_mtime_ns
+        except OSError:
+            self.__cache.pop(directory, None)
+            return ()
+        if cached is not None and cached[0] == mtime:
+            self.__cache[directory] = (mtime, now, cached[2])
+            return cached[2]
+        result = []
+        try:
+            with (os.scandir(directory) if not stats.enabled else stats.call('fs.listdir', os.scandir, directory)) as entries:
+                for entry in entries:
+                    try:
+                        result.append((entry.name, entry.is_dir()))
+                    except OSError: # Deleted while listing
+                        pass
+        except (NotADirectoryError, FileNotFoundError, PermissionError):
+            self.__cache.pop(directory, None)
+            return ()
+        result = tuple(result)
+        self.__cache[directory] = (mtime, now, result)
+        return result
+
+    def map(self, directories, ttl=None):
+        """Return the entries() of a list of directories. They are listed in parallel."""
+        directories = list(directories)
+        if len(directories) < 2:
+            return [self.entries(directory, ttl) for directory in directories]
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.__workers)
+        func = lambda directory: self.entries(directory, ttl)
+        return list(self.__executor.map(func if not stats.enabled else stats.bind(func), directories))
+
+    def invalidate(self, directory):
+        """Forget the listing of a directory and of everything under it"""
+        directory = directory.rstrip('/') or '/'
+        prefix = directory if directory.endswith('/') else directory + '/'
+        with self.__lock:
+            for key in [key for key in list(self.__cache) if key == directory or key.startswith(prefix)]:
+                self.__cache.pop(key, None)
+
+    def clear(self):
+        """Forget every listing"""
+        with self.__lock:
+            self.__cache = {}
+
+_default = None
+_default_lock = threading.Lock()
+
+def default():
+    """
+    Return the ListingCache object shared by the whole process.
+
+    Its ttl is the OVFX_LISTING_TTL variable when set, otherwise 5 seconds.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ListingCache(float(os.getenv('OVFX_LISTING_TTL', '5')))
+        return _default
@@ -1,20 +1,23 @@
 
 import collections
 import copy
+import itertools
 import os
 import re
-import yaml
 
 from ovfx import exceptions as ex
+from ovfx import stats
 import importlib
 import ovfx.cfg
 
 class Location(object):
 
     def __init__(self, model):
-        self.__config = ovfx.cfg.location
+        # Keep the config generation so this object stays consistent even if the config is reloaded
+        self.__generation = ovfx.cfg.current()
+        self.__config = self.__generation.location()
         self.set_model(model)
-        self.__bundle = FragBundle()
+        self.__bundle = FragBundle(self.__generation)
 
     def __repr__(self):
         cl = self.__class__
@@ -36,6 +39,10 @@ class Location(object):
     def model(self):
         return self.__model
 
+    def config(self):
+        """Return the ovfx.cfg.Config generation used by this location"""
+        return self.__generation
+
     def tags(self):
         """Return all tags from the current model"""
         result = []
@@ -65,63 +72,316 @@ class Location(object):
         if expand:
             expanded_model = os.path.expandvars(expanded_model)
 
-        exp = expanded_model
-        complement = re.split('<[a-z_]*>', expanded_model)
-        complement = [s.replace('.', '\.') for s in complement]  # The dot must be escaped because it's a special character in regex
-        regex_list = []
-        key_list = []
-        for match in re.finditer('<[a-z_]*>', expanded_model):
-            key = match.group()[1:-1]
-            # Get the regex
-            if key not in self.__bundle():
-                raise ex.NotFound('The following path fragment definition cannot be found in the studio configuration file: {}'.format(key))
-            key_list.append(key)
-            # Extract the data
-            regex_list.append(self.__bundle(key).regex())
-
-        # Go through each tag one at a time and extract the value
-        for i in range(len(regex_list)):
-            key = key_list[i]
-            regex_current_list = list(regex_list)
-            regex_current_list[i] = '({})'.format(regex_list[i]) # Surround the current tag with () to make it the active group
-            # Combine the regex with the complement list
-            result = [None]*(len(complement)+len(regex_current_list))
-            result[::2] = complement
-            result[1::2] = regex_current_list
-            exp = ''.join(result)
-            result_match = re.match(exp, path)
-            # Does not try to extract a tag when already found earlier in the path.
-            # This helps avoiding tags that are often abiguous near the end of a path.
-            # For example if the project name has an _ in it but each tag is also
-            # separated by an _ in the file name, the regex may misinterpret the _ separator
-            # with the actual _ in the project name. Extracting the project from the folder name
-            # is not ambiguous because it's separated by slashes so _ can only be part of the name.
-            #
-            # However it means that it doesn't enforce consistency with a tag that occurs mutliple time.
-            # For example if the project name folder is different than the one we see in the file name,
-            # it will ignore the one in the file name without complaining.
-            # We could add an optional validation that would error out if it detects discrepency between values for the same tags.
-            if self.__bundle(key).value() == None:
-                if result_match == None:
-                    self.__bundle(key).set_value(None)
-                else:
-                    self.__bundle(key).set_value(result_match.groups()[0])
+        matcher = _matcher(expanded_model, self.__bundle._config())
+        result_match = matcher.match(path) if not stats.enabled else stats.call('regex.match', matcher.match, path)
+        # Only the first occurrence of a tag is used to set its value.
+        # This helps avoiding tags that are often abiguous near the end of a path.
+        # For example if the project name has an _ in it but each tag is also
+        # separated by an _ in the file name, the regex may misinterpret the _ separator
+        # with the actual _ in the project name. Extracting the project from the folder name
+        # is not ambiguous because it's separated by slashes so _ can only be part of the name.
+        #
+        # However it means that it doesn't enforce consistency with a tag that occurs mutliple time.
+        # For example if the project name folder is different than the one we see in the file name,
+        # it will ignore the one in the file name without complaining.
+        # We could add an optional validation that would error out if it detects discrepency between values for the same tags.
+        for key, group in matcher.groups():
+            if result_match is None:
+                self.__bundle(key).set_value(None)
+            else:
+                self.__bundle(key).set_value(result_match.group(group))
+
+    def extract_many(self, paths, expand=False, chunk_size=1024):
+        """
+        Extract the fragments from many paths at once.
+
+        The internal bundle is not modified. The results are grouped in ContextBatch
+        objects holding one column of values per tag instead of one context per path.
+        It is a generator so any iterable of paths, even an endless one, can be processed
+        with a flat memory usage.
+
+        Args:
+            paths       : Any iterable of paths
+            expand      : Expand the environment variables of the model like extract_frags
+            chunk_size  : Maximum number of paths per yielded ContextBatch
+
+        Examples:
+            import ovfx.loc
+            loc = ovfx.loc.Location(['software', 'render', 'image', 'shot'])
+            for batch in loc.extract_many(open('/tmp/render_list.txt').read().splitlines()):
+                for shot, valid in zip(batch.column('shot'), batch.valid()):
+                    ...
+        """
+        expanded_model = self.__model
+        if expand:
+            expanded_model = os.path.expandvars(expanded_model)
+        matcher = _matcher(expanded_model, self.__bundle._config())
+        match = matcher.match
+        tags = [key for key, group in matcher.groups()]
+        groups = [group for key, group in matcher.groups()]
+
+        batch = None
+        for path in paths:
+            if batch is None:
+                batch = ContextBatch(tags)
+                path_column, valid, columns = batch._buffers()
+            result_match = match(path) if not stats.enabled else stats.call('regex.match', match, path)
+            path_column.append(path)
+            if result_match is None:
+                valid.append(0)
+                for column in columns:
+                    column.append(None)
+            else:
+                valid.append(1)
+                for column, group in zip(columns, groups):
+                    column.append(result_match.group(group))
+            if len(valid) >= chunk_size:
+                yield batch
+                batch = None
+        if batch is not None:
+            yield batch
 
     def path(self, bundle=None, **kwargs):
-        # Assign to a temp FragBundle object because might override some parameters
+        # Use a temp FragBundle object when overriding some parameters. The duplicate is cheap, it shares the values until they are overridden.
         if bundle: # Use the custom FragBundle object instead
-            bundle_obj = bundle.duplicate()
+            bundle_obj = bundle
         else: # Use the internal one
-            bundle_obj = self.__bundle.duplicate()
-        # override the value first and let it raise an error if the format is invalid
+            bundle_obj = self.__bundle
+        if kwargs:
+            bundle_obj = bundle_obj.duplicate()
+            # override the value first and let it raise an error if the format is invalid
+            bundle_obj.set_value(**kwargs)
+        return _formatter(self.__model).template(bundle_obj)
+
+    def paths(self, bundle=None, aligned=False, **value_lists):
+        """
+        Return a generator of paths built from lists of values per fragment.
+
+        The fragments without a list use the value from the bundle like path() does.
+        Each distinct value is validated once before the first path is generated.
+        Values which are not strings are converted with str().
+
+        Args:
+            bundle       : Custom FragBundle object to use instead of the internal one
+            aligned      : The lists are used as aligned columns, the nth path uses the nth value of each list.
+                           Otherwise a path is generated for every combination of values.
+            value_lists  : A list, a range or a single string for each fragment id
+
+        Raises:
+            NotFound      : When a fragment id is not in the bundle
+            InvalidFormat : When a value does not match its fragment regex
+            ValueError    : When the aligned lists do not all have the same length
+
+        Examples:
+            import ovfx.loc
+            loc = ovfx.loc.Location(['publish', 'render', 'image', 'shot'])
+            loc.bundle.set_value(proj='MyProject', epis='E400', seq='010', task='fx', ver='001', ext='exr')
+            for path in loc.paths(shot=['0010', '0020'], elem=['fire', 'smoke'], frame=['.{}'.format(f) for f in range(1001, 1101)]):
+                print(path)
+        """
+        bundle_obj = bundle if bundle else self.__bundle
+        columns = []
+        for key in value_lists:
+            frag = bundle_obj(key)
+            if frag is None:
+                raise ex.NotFound('Cannot find the following fragment: {}'.format(key))
+            values = value_lists[key]
+            if type(values) == str:
+                values = [values]
+            values = [value if type(value) == str else str(value) for value in values]
+            for value in set(values):
+                if not frag.validate_value(value):
+                    raise ex.InvalidFormat('The following value for fragment "{}" does not comply with the regular expression \"{}\": {}'.format(key, frag.regex(), value))
+            columns.append(values)
+        if aligned:
+            if len(set(len(values) for values in columns)) > 1:
+                raise ValueError('The value lists must all have the same length when aligned: {}'.format(dict((key, len(values)) for key, values in zip(value_lists, columns))))
+            rows = zip(*columns)
+        else:
+            rows = itertools.product(*columns)
+        template = _formatter(self.__model).template(bundle_obj, list(value_lists))
+        return (template.format(*row) for row in rows)
+
+    def values(self, id, **kwargs):
+        """
+        Return the sorted list of the values of a fragment found on disk.
+
+        Only the folders needed to reach the level of the fragment in the model are listed.
+        The listings come from the cache shared by the process, see ovfx.listing, so opening
+        the same drop down menu again or the one of a sibling does not list the folders again.
+
+        Args:
+            id      : Fragment id. Eg. seq
+            kwargs  : Fragment values overriding the ones of the internal bundle.
+                      The fragments of the levels above without a value match anything.
+
+        Raises:
+            NotFound      : When the fragment is not a tag of the model or a fragment id of kwargs does not exist
+            InvalidFormat : When a value does not match its fragment regex
+
+        Examples:
+            import ovfx.loc
+            hdri = ovfx.loc.Location(['hdri'])
+            print(hdri.values('epis', proj='MyProject'))
+            print(hdri.values('seq', proj='MyProject')) # The sequences of every episode
+        """
+        return sorted(self.__level_values(id, kwargs, None))
+
+    def versions(self, frag='ver', **kwargs):
+        """
+        Return the versions found on disk sorted by their integer value. Eg. ['009', '010', '043']
+
+        Only the folder level of the version is listed, the levels below are never looked at.
+        The listing is cached per directory modification time so the answer is always up to
+        date and repeated calls only cost a stat of the folder.
+
+        Args:
+            frag    : Fragment id of the version
+            kwargs  : Fragment values overriding the ones of the internal bundle
+
+        Raises:
+            NotFound      : When the fragment is not a tag of the model or a fragment id of kwargs does not exist
+            InvalidFormat : When a value does not match its fragment regex
+        """
+        return sorted(self.__level_values(frag, kwargs, 0), key=_version_key)
+
+    def latest(self, frag='ver', **kwargs):
+        """
+        Return the highest version found on disk or None when there is none. See versions().
+
+        Examples:
+            import ovfx.loc
+            loc = ovfx.loc.Location(['software', 'render', 'image', 'shot'])
+            loc.extract_frags('/mnt/prod/projects/MyProject/E400/Seq_010/0010/3D/houdini/render/fx_fire/v043/MyProject_E400_Seq_010_0010_fx_fire_v043.1001.tif')
+            print(loc.latest()) # The latest version of fx_fire in shot 0010
+        """
+        values = self.__level_values(frag, kwargs, 0)
+        return max(values, key=_version_key) if values else None
+
+    def __level_values(self, id, kwargs, ttl):
+        """Return the set of the values of a fragment found on disk at the level of its first occurrence"""
+        import ovfx.listing
+        bundle_obj = self.__bundle.duplicate()
         bundle_obj.set_value(**kwargs)
-        path = self.__model
-        for tag in list(set(re.findall('<[a-z_]*>', path))):
-            key = tag[1:-1]
-            if key in bundle_obj(): # get the value from the var
-                value = bundle_obj(key).value() if bundle_obj(key).value() is not None else 'UNDEFINED'
-            path = path.replace(tag, value)
-        return path
+        levels = _levels(self.__model, bundle_obj._config())
+        if id not in levels.keys():
+            raise ex.NotFound('The fragment "{}" is not a tag of the model {}'.format(id, self.__model))
+        values = {}
+        for key in levels.keys():
+            if key != id and bundle_obj(key) is not None and bundle_obj(key).value() is not None:
+                values[key] = bundle_obj(key).value()
+        plan = levels.plan(values)
+        cache = ovfx.listing.default()
+
+        directories = ['']
+        for index, (literal, regex, groups) in enumerate(plan):
+            group = next((group for key, group in groups if key == id), None)
+            last = index + 1 == len(plan)
+            if literal is not None:
+                directories = ['{}/{}'.format(directory, literal) if index else literal for directory in directories]
+                continue
+            listed = [directory or ('/' if index else '.') for directory in directories]
+            next_directories = []
+            result = set()
+            for directory, entries in zip(directories, cache.map(listed, ttl)):
+                for name, is_dir in entries:
+                    if not (last or is_dir):
+                        continue
+                    match = regex.fullmatch(name) if not stats.enabled else stats.call('regex.match', regex.fullmatch, name)
+                    if match is None:
+                        continue
+                    if group is not None:
+                        result.add(match.group(group))
+                    else:
+                        next_directories.append('{}/{}'.format(directory, name) if index else name)
+            if group is not None:
+                return result
+            directories = next_directories
+            if not directories:
+                break
+        return set()
+
+    def glob(self, limit=None, cancel=None, workers=8, **kwargs):
+        """
+        Return a generator of the existing paths matching the model and the fragment values.
+
+        The file system is searched one folder level of the model at a time. Only the folders
+        needed by the model are listed and their entries are filtered with the fragment regex.
+        The fragments without a value match anything valid for their regex.
+
+        Args:
+            limit   : Maximum number of paths. All of them when None.
+            cancel  : Optional threading.Event. The search stops as soon as it is set.
+                      Closing the generator stops the search too.
+            workers : Maximum number of folders listed at the same time
+            kwargs  : Fragment values overriding the ones of the internal bundle
+
+        Returns:
+            A generator of (path, FragBundle) tuples. Each bundle holds the context extracted from the path.
+            The paths are not sorted since the folders are listed in parallel.
+
+        Raises:
+            NotFound      : When a fragment id does not exist
+            InvalidFormat : When a value does not match its fragment regex
+
+        Examples:
+            import ovfx.loc
+            hdri = ovfx.loc.Location(['hdri'])
+            for path, bundle in hdri.glob(limit=50, proj='MyProject', epis='E300', seq='010'):
+                print(bundle('hdricat').value(), path)
+        """
+        import ovfx.walk
+        bundle_obj = self.__bundle.duplicate()
+        bundle_obj.set_value(**kwargs)
+        values = {}
+        for key in set(self.tags()):
+            if bundle_obj(key) is not None and bundle_obj(key).value() is not None:
+                values[key] = bundle_obj(key).value()
+        list_level = ovfx.walk._list_level if not stats.enabled else stats.bind(ovfx.walk._list_level)
+        results = ovfx.walk._walk(ovfx.walk._starts([((), self.__model)], bundle_obj._config(), values), workers, None, cancel, list_level)
+        return self.__glob_results(results, bundle_obj, limit)
+
+    def aglob(self, limit=None, workers=8, chunk_size=16, timeout=None, **kwargs):
+        """
+        Async version of glob(). The results are streamed by chunks from the pool of ovfx.aio.
+
+        The search stops when the async generator is closed or cancelled.
+
+        Args:
+            chunk_size  : Number of results to wait for at a time. Small values show the first results sooner.
+            timeout     : Number of seconds to wait for each chunk. No limit when None.
+
+        Raises:
+            asyncio.TimeoutError : When the timeout is reached
+
+        Examples:
+            import ovfx.loc
+            hdri = ovfx.loc.Location(['hdri'])
+            async for path, bundle in hdri.aglob(limit=50, proj='MyProject', epis='E300', seq='010'):
+                print(bundle('hdricat').value(), path)
+        """
+        import threading
+        from ovfx import aio
+        cancel = threading.Event()
+        # The values are validated right away like glob()
+        results = self.glob(limit, cancel, workers, **kwargs)
+        return aio.iterate(lambda: results, chunk_size, timeout, cancel)
+
+    @staticmethod
+    def __glob_results(results, bundle_obj, limit):
+        count = 0
+        try:
+            if limit is not None and limit <= 0:
+                return
+            for keys, context, path in results:
+                bundle = bundle_obj.duplicate()
+                bundle.set_value(**context)
+                yield path, bundle
+                count += 1
+                if limit is not None and count >= limit:
+                    break
+        finally:
+            results.close()
 
     def parent(self, id, index=0):
 
@@ -133,13 +393,19 @@ class Location(object):
                 result.append(self.__model[:span[1]])
         if not result:
             raise KeyError('The following fragment id cannot be found in the current location model: {}'.format(id))
-        new_obj = copy.deepcopy(self)
+        new_obj = self.duplicate()
         try:
             new_obj.set_model(result[index])
         except IndexError:
             raise IndexError('The index {} is outside the tag list "{}" of size {}.'.format(index, id, len(result)))
         return new_obj
 
+    def duplicate(self):
+        """Return a copy of this location sharing the bundle values until one of them is modified"""
+        new_obj = copy.copy(self)
+        new_obj.bundle = self.__bundle.duplicate()
+        return new_obj
+
     def valid(self):
         """
         Return whether there is a valid non Null internal fragment for each tag
@@ -148,7 +414,7 @@ class Location(object):
         result = True
         for tag in list(set(re.findall('<[a-z_]*>', self.__model))):
             key = tag[1:-1]
-            if key not in self.__bundle() or self.__bundle(key).value() is None:
+            if self.__bundle(key) is None or self.__bundle(key).value() is None:
                 result = False
         return result
 
@@ -158,103 +424,589 @@ class Location(object):
         result += '\n#####################################'
         return result
 
+def _version_key(value):
+    """Sort the numerical versions by value and the other ones after them by name"""
+    return (0, int(value), value) if value.isdigit() else (1, 0, value)
+
+class LocationIndex(object):
+    """
+    Classify a path against many location models at once.
+
+    The models are stored in a trie made of the literal folders found before their
+    first tag. Only the models sharing the path's folders are tried with their
+    compiled matcher, so the cost does not grow with the number of unrelated models.
+    """
+
+    def __init__(self, models=None, expand=False):
+        """
+        Args:
+            models  : List of model keys like ['software', 'render', 'image', 'shot'].
+                      All the models of the location configuration are used when None.
+            expand  : Expand the environment variables of the models
+        """
+        self.__models = models
+        self.__expand = expand
+        self.__build(ovfx.cfg.current())
+
+    def __build(self, generation):
+        self.__generation = generation
+        models = self.__models
+        if models is None:
+            models = [keys for keys, model in generation.models()]
+        self.__trie = {}
+        self.__keys = []
+        for keys in models:
+            model = generation.location()
+            for key in keys:
+                model = model[key]
+            if not model:
+                continue
+            if self.__expand:
+                model = os.path.expandvars(model)
+            self.__add(tuple(keys), model)
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} object "Number of models={}" at {}>'.format(cl.__module__, cl.__name__, len(self.__keys), hex(id(self)))
+        return result
+
+    def __add(self, keys, model):
+        # Only full folder names can be used in the trie. A partial name before a tag like v<ver> is left to the matcher.
+        literal = re.split(_TAG_REGEX, model)[0]
+        node = self.__trie
+        for folder in literal.split('/')[:-1]:
+            node = node.setdefault(folder, {})
+        entry = (len(self.__keys), keys, _matcher(model, self.__generation.fragment()))
+        node.setdefault(None, []).append(entry)
+        self.__keys.append(keys)
+
+    def models(self):
+        """Return the keys of every indexed model"""
+        return list(self.__keys)
+
+    def classify(self, path, exact=False):
+        """
+        Return a (model keys, context) pair for each model matching the path.
+
+        The context is a dictionary with the value of each tag of the model.
+        The pairs are in the same order as the models in the index.
+
+        Args:
+            path    : Path to classify
+            exact   : The whole path must match the model. Otherwise a path with more
+                      folders than the model is still accepted like with Location.extract_frags.
+
+        Examples:
+            import ovfx.loc
+            index = ovfx.loc.LocationIndex()
+            for keys, context in index.classify('/mnt/prod/projects/MyProject/E400'):
+                print(keys, context)
+        """
+        return list(self.__matches(path, exact))
+
+    def first(self, path, exact=False):
+        """Return the first (model keys, context) pair matching the path or None"""
+        for result in self.__matches(path, exact):
+            return result
+
+    def __matches(self, path, exact):
+        # The index is derived from the config. Rebuild it when a new generation has been loaded.
+        generation = ovfx.cfg.current()
+        if generation is not self.__generation:
+            self.__build(generation)
+        candidates = []
+        node = self.__trie
+        for folder in path.split('/'):
+            candidates.extend(node.get(None, ()))
+            node = node.get(folder)
+            if node is None:
+                break
+        else:
+            candidates.extend(node.get(None, ()))
+        candidates.sort(key=lambda entry: entry[0])
+
+        for order, keys, matcher in candidates:
+            match = matcher.fullmatch if exact else matcher.match
+            result_match = match(path) if not stats.enabled else stats.call('regex.match', match, path)
+            if result_match is not None:
+                context = collections.OrderedDict((key, result_match.group(group)) for key, group in matcher.groups())
+                yield keys, context
+
+class _Formatter(object):
+    """
+    Compiled form of a location model used to build paths from fragment values.
+    """
+
+    def __init__(self, model):
+        parts = re.split('({})'.format(_TAG_REGEX), model)
+        self.__literals = parts[0::2]
+        self.__keys = [tag[1:-1] for tag in parts[1::2]]
+
+    def template(self, bundle, variables=None):
+        """
+        Return the model with its tags replaced by the bundle values.
+
+        A tag without value is replaced by UNDEFINED. A tag that is not part of the bundle is left as is.
+        When variables is a list of fragment ids, their tags are replaced by {0}, {1} etc. instead
+        following the list order and the result is meant to be used with str.format().
+        """
+        escape = variables is not None
+        result = [self.__escape(self.__literals[0], escape)]
+        for key, literal in zip(self.__keys, self.__literals[1:]):
+            if escape and key in variables:
+                result.append('{{{}}}'.format(variables.index(key)))
+            else:
+                if bundle(key) is None:
+                    value = '<{}>'.format(key)
+                else:
+                    value = bundle._value(key)
+                    if value is None:
+                        value = 'UNDEFINED'
+                result.append(self.__escape(value, escape))
+            result.append(self.__escape(literal, escape))
+        return ''.join(result)
+
+    @staticmethod
+    def __escape(value, escape):
+        if escape:
+            return value.replace('{', '{{').replace('}', '}}')
+        return value
+
+# Compiled formatters shared by every Location object. They only depend on the model.
+_formatters = {}
+
+def _formatter(model):
+    """Return the cached _Formatter of a model, compile it on the first call"""
+    formatter = _formatters.get(model)
+    if formatter is None:
+        formatter = _Formatter(model)
+        _formatters[model] = formatter
+    return formatter
+
+class ContextBatch(object):
+    """
+    Columnar result of Location.extract_many.
+
+    Each tag of the location model has its own column of values, aligned with the
+    paths column. The validity mask holds 1 when the path matched the model, 0 otherwise.
+    The values of an invalid path are all None.
+    """
+
+    def __init__(self, tags):
+        self.__tags = tuple(tags)
+        self.__paths = []
+        self.__valid = bytearray()
+        self.__columns = [[] for tag in self.__tags]
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} object "Number of paths={}" at {}>'.format(cl.__module__, cl.__name__, len(self.__paths), hex(id(self)))
+        return result
+
+    def __len__(self):
+        return len(self.__paths)
+
+    def _buffers(self):
+        """Return the internal paths, validity and value columns to fill them"""
+        return self.__paths, self.__valid, self.__columns
+
+    def tags(self):
+        return self.__tags
+
+    def paths(self):
+        return self.__paths
+
+    def valid(self):
+        """Return the validity mask as a bytearray"""
+        return self.__valid
+
+    def column(self, id):
+        """Return the values of a tag for every path"""
+        if id not in self.__tags:
+            raise KeyError('The following fragment id cannot be found in the current location model: {}'.format(id))
+        return self.__columns[self.__tags.index(id)]
+
+    def columns(self):
+        """Return a dictionary with the values column of each tag"""
+        return collections.OrderedDict(zip(self.__tags, self.__columns))
+
+    def context(self, index):
+        """Return the fragment values of a single path as a dictionary"""
+        return collections.OrderedDict((tag, column[index]) for tag, column in zip(self.__tags, self.__columns))
+
+class _Matcher(object):
+    """
+    Compiled form of a location model used to extract the fragment values from a path.
+
+    All the tags are combined into a single regular expression where each tag
+    occurrence is a named group. Only the first occurrence of a tag is reported by groups().
+    """
+
+    def __init__(self, model, fragment_config):
+        complement = re.split(_TAG_REGEX, model)
+        complement = [s.replace('.', '\\.') for s in complement]  # The dot must be escaped because it's a special character in regex
+        pattern = [complement[0]]
+        self.__groups = []
+        for i, match in enumerate(re.finditer(_TAG_REGEX, model)):
+            key = match.group()[1:-1]
+            if key not in fragment_config:
+                raise ex.NotFound('The following path fragment definition cannot be found in the studio configuration file: {}'.format(key))
+            group = 't{}'.format(i)
+            pattern.append('(?P<{}>{})'.format(group, fragment_config[key]['regex']))
+            pattern.append(complement[i + 1])
+            if key not in [k for k, g in self.__groups]:
+                self.__groups.append((key, group))
+        pattern = ''.join(pattern)
+        self.__regex = re.compile(pattern) if not stats.enabled else stats.call('regex.compile', re.compile, pattern)
+
+    def groups(self):
+        """Return a (fragment id, group name) pair for the first occurrence of each tag"""
+        return self.__groups
+
+    def match(self, path):
+        return self.__regex.match(path)
+
+    def fullmatch(self, path):
+        return self.__regex.fullmatch(path)
+
+class _Levels(object):
+    """
+    Compiled form of a location model split in folder levels.
+
+    Each level is either a literal folder name or a regular expression matching a
+    whole folder or file name with a named group per tag. It is used to search the
+    file system one level at a time. Tags are expected to never contain a /.
+    """
+
+    def __init__(self, model, fragment_config):
+        self.__fragment_config = fragment_config
+        self.__keys = []
+        self.__levels = []
+        for part in model.split('/'):
+            keys = [match[1:-1] for match in re.findall(_TAG_REGEX, part)]
+            for key in keys:
+                if key not in fragment_config:
+                    raise ex.NotFound('The following path fragment definition cannot be found in the studio configuration file: {}'.format(key))
+                if key not in self.__keys:
+                    self.__keys.append(key)
+            groups = tuple((key, 't{}'.format(i)) for i, key in enumerate(keys))
+            regex = None
+            if keys:
+                pattern = self.__pattern(part, groups, {})
+                regex = re.compile(pattern) if not stats.enabled else stats.call('regex.compile', re.compile, pattern)
+            self.__levels.append((part, regex, groups))
+
+    def __pattern(self, part, groups, values):
+        literals = re.split(_TAG_REGEX, part)
+        pattern = [re.escape(literals[0])]
+        for (key, group), literal in zip(groups, literals[1:]):
+            if key in values:
+                pattern.append('(?P<{}>{})'.format(group, re.escape(values[key])))
+            else:
+                pattern.append('(?P<{}>{})'.format(group, self.__fragment_config[key]['regex']))
+            pattern.append(re.escape(literal))
+        return ''.join(pattern)
+
+    def keys(self):
+        """Return the tags of the model in order of first occurrence"""
+        return self.__keys
+
+    def plan(self, values=None):
+        """
+        Return the levels as a list of (literal, regex, groups) tuples.
+
+        The literal is the folder name when the level has no tag or when all its tags
+        have a value in the values dictionary. Otherwise it is None and the regex must
+        be used. The groups are (fragment id, group name) pairs. The tags with a value
+        only match that value in the regex.
+        """
+        values = values or {}
+        result = []
+        for part, regex, groups in self.__levels:
+            fixed = [key for key, group in groups if key in values]
+            if regex is None:
+                result.append((part, None, groups))
+            elif len(fixed) == len(groups):
+                for key, group in groups:
+                    part = part.replace('<{}>'.format(key), values[key])
+                result.append((part, None, groups))
+            elif fixed:
+                pattern = self.__pattern(part, groups, values)
+                result.append((None, re.compile(pattern) if not stats.enabled else stats.call('regex.compile', re.compile, pattern), groups))
+            else:
+                result.append((None, regex, groups))
+        return result
+
+_TAG_REGEX = '<[a-z_]*>'
+
+# Compiled matchers shared by every Location object. The key is the model and the
+# id of the fragment config it was compiled against. The config is kept in the value
+# so its id cannot be reused by another object while the entry exists.
+_matchers = {}
+
+_levels_cache = {}
+
+def _levels(model, fragment_config):
+    """Return the cached _Levels of a model, compile it on the first call"""
+    key = (model, id(fragment_config))
+    cached = _levels_cache.get(key)
+    if cached is None or cached[0] is not fragment_config:
+        cached = (fragment_config, _Levels(model, fragment_config))
+        _levels_cache[key] = cached
+    return cached[1]
+
+def _matcher(model, fragment_config):
+    """Return the cached _Matcher of a model, compile it on the first call"""
+    key = (model, id(fragment_config))
+    cached = _matchers.get(key)
+    if cached is None or cached[0] is not fragment_config:
+        cached = (fragment_config, _Matcher(model, fragment_config))
+        _matchers[key] = cached
+    return cached[1]
+
+class FragDef(object):
+    """
+    Immutable fragment definition from the fragment configuration.
+
+    A single definition exists per fragment id and config. It is shared by every
+    Frag object so the label, the regex and its compiled form are never copied.
+    """
+    __slots__ = ('__id', '__label', '__regex', '__validator')
+
+    def __init__(self, id, label, regex):
+        object.__setattr__(self, '_FragDef__id', id)
+        object.__setattr__(self, '_FragDef__label', label)
+        object.__setattr__(self, '_FragDef__regex', regex)
+        pattern = '{}$'.format(regex)
+        object.__setattr__(self, '_FragDef__validator', re.compile(pattern) if not stats.enabled else stats.call('regex.compile', re.compile, pattern))
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} object "id={}" at {}>'.format(cl.__module__, cl.__name__, self.__id, hex(id(self)))
+        return result
+
+    def __setattr__(self, name, value):
+        raise AttributeError('A fragment definition cannot be modified.')
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (self.__class__, (self.__id, self.__label, self.__regex))
+
+    def id(self):
+        return self.__id
+
+    def label(self):
+        return self.__label
+
+    def regex(self):
+        return self.__regex
+
+    @stats.helper
+    def validate_value(self, value):
+        if value is None:
+            return True
+        match = self.__validator.match
+        return (match(value) if not stats.enabled else stats.call('regex.match', match, value)) is not None
+
+# Fragment definitions shared by every FragBundle object. Same caching strategy as the matchers.
+_frag_defs_cache = {}
+
+def _frag_defs(fragment_config):
+    """Return an ordered dictionary of FragDef for each fragment of the config. It must not be modified."""
+    key = id(fragment_config)
+    cached = _frag_defs_cache.get(key)
+    if cached is None or cached[0] is not fragment_config:
+        defs = collections.OrderedDict()
+        for frag_id in fragment_config:
+            frag = fragment_config[frag_id]
+            defs[frag_id] = FragDef(frag_id, frag['label'], frag['regex'])
+        cached = (fragment_config, defs)
+        _frag_defs_cache[key] = cached
+    return cached[1]
+
 class Frag(object):
-    """Fragment object representing a path variable component."""
+    """
+    Fragment object representing a path variable component.
+
+    The Frag objects returned by a FragBundle are views on the bundle's values.
+    Setting their value modifies the bundle.
+    """
+    __slots__ = ('__def', '__bundle', '__value')
 
     def __init__(self, id):
-        frag = ovfx.cfg.fragment[id]
-        self.__id = id
-        self.__label = frag['label']
-        self.__regex = frag['regex']
+        self.__def = _frag_defs(ovfx.cfg.fragment)[id]
+        self.__bundle = None
         self.__value = None
 
+    @classmethod
+    def _view(cls, definition, bundle):
+        """Return a Frag reading and writing its value in the bundle"""
+        frag = cls.__new__(cls)
+        frag.__def = definition
+        frag.__bundle = bundle
+        frag.__value = None
+        return frag
+
     def __repr__(self):
         cl = self.__class__
-        result = '<{}.{} object "id={}, value={}" at {}>'.format(cl.__module__, cl.__name__, self.__id, self.__value, hex(id(self)))
+        result = '<{}.{} object "id={}, value={}" at {}>'.format(cl.__module__, cl.__name__, self.id(), self.value(), hex(id(self)))
         return result
 
     def __eq__(self, other):
         if type(other) == str: # compare with the id
-            return self.__id == other
+            return self.id() == other
         elif type(self) == type(other):
             return id(self) == id(other)
         else:
             raise NotImplementedError
 
+    def definition(self):
+        return self.__def
+
     def id(self):
-        return self.__id
+        return self.__def.id()
 
     def label(self):
-        return self.__label
+        return self.__def.label()
 
     def regex(self):
-        return self.__regex
+        return self.__def.regex()
 
     def value(self):
-        return self.__value
+        if self.__bundle is None:
+            return self.__value
+        return self.__bundle._value(self.__def.id())
 
+    @stats.helper
     def set_value(self, value):
         if not self.validate_value(value):
-            raise ex.InvalidFormat('The following value for fragment "{}" does not comply with the regular expression \"{}\": {}'.format(self.__id, self.__regex, value))
-        self.__value = value
+            raise ex.InvalidFormat('The following value for fragment "{}" does not comply with the regular expression \"{}\": {}'.format(self.id(), self.regex(), value))
+        if self.__bundle is None:
+            self.__value = value
+        else:
+            self.__bundle._set_value(self.__def.id(), value)
 
+    @stats.helper
     def validate_value(self, value):
-        result = False
-        if value is None or re.match('{}$'.format(self.__regex), value):
-            result = True
-        return result
+        return self.__def.validate_value(value)
 
     def duplicate(self):
-        return copy.deepcopy(self)
+        """Return a standalone copy of this fragment"""
+        frag = self.__class__._view(self.__def, None)
+        frag.__value = self.value()
+        return frag
 
 class FragBundle(object):
-    """Collection of fragments representing a context"""
-    def __init__(self):
-        self.__config = ovfx.cfg.fragment
+    """
+    Collection of fragments representing a context
+
+    Only the values are stored in the bundle. The fragment definitions are shared
+    between bundles and duplicate() shares the values too until one of the bundles
+    modifies them. That way a copy only costs something when it is modified.
+    """
+    def __init__(self, config=None):
+        """
+        Args:
+            config : ovfx.cfg.Config generation to get the fragment definitions from. The current one when None.
+        """
+        if config is None:
+            config = ovfx.cfg.current()
+        self.__config = config.fragment()
         self.reset_frags()
 
     def __repr__(self):
         cl = self.__class__
-        result = '<{}.{} object "Number of Frag={}" at {}>'.format(cl.__module__, cl.__name__, len(self.__frags), hex(id(self)))
+        result = '<{}.{} object "Number of Frag={}" at {}>'.format(cl.__module__, cl.__name__, len(self.__defs), hex(id(self)))
         return result
 
     def __call__(self, id=None):
         if id:
-            if id in self.__frags:
-                return self.__frags[id]
+            if id in self.__defs:
+                return self.__view(id)
         else:
-            return [self.__frags[k] for k in self.__frags]
+            return [self.__view(k) for k in self.__defs]
+
+    def __view(self, id):
+        frag = self.__views.get(id)
+        if frag is None:
+            frag = Frag._view(self.__defs[id], self)
+            self.__views[id] = frag
+        return frag
+
+    def _config(self):
+        """Return the fragment config of the definitions"""
+        return self.__config
+
+    def _value(self, id):
+        return self.__values.get(id)
+
+    def _set_value(self, id, value):
+        """Set an already validated value. Copy the values first when they are shared with another bundle."""
+        if self.__values_shared:
+            if stats.enabled:
+                stats.count('bundle.copy')
+            self.__values = dict(self.__values)
+            self.__values_shared = False
+        if value is None:
+            self.__values.pop(id, None)
+        else:
+            self.__values[id] = value
 
     def reset_frags(self):
-        self.__frags = collections.OrderedDict()
-        for key in self.__config:
-            frag = Frag(key)
-            self.__frags[key] = frag
+        self.__defs = _frag_defs(self.__config)
+        self.__defs_shared = True
+        self.__values = {}
+        self.__values_shared = False
+        self.__views = {}
 
     def frag(self, id):
         result = None
-        if id in self.__frags:
-            return self.__frags[id]
+        if id in self.__defs:
+            return self.__view(id)
 
     def frags(self):
-        return tuple(self.__frags.values())
+        return tuple(self.__view(k) for k in self.__defs)
 
     def set_value(self, **kwargs):
         for k in kwargs:
-            if k not in self.__frags:
+            if k not in self.__defs:
                 raise ex.NotFound('Cannot find the following fragment: {}'.format(k))
-            self.__frags[k].set_value(kwargs[k])
+            self.__view(k).set_value(kwargs[k])
 
     def remove_frag(self, id):
         """Remove the frag from this bundle"""
-        if id in self.__frags:
-            self.__frags.pop(id)
+        if id in self.__defs:
+            if self.__defs_shared:
+                if stats.enabled:
+                    stats.count('bundle.copy')
+                self.__defs = collections.OrderedDict(self.__defs)
+                self.__defs_shared = False
+            self.__defs.pop(id)
+            self._set_value(id, None)
+            self.__views.pop(id, None)
 
     def _set_frags(self, frag_dict):
-        self.__frags = frag_dict
+        self.__defs = collections.OrderedDict((k, frag_dict[k].definition()) for k in frag_dict)
+        self.__defs_shared = False
+        self.__values = dict((k, frag_dict[k].value()) for k in frag_dict if frag_dict[k].value() is not None)
+        self.__values_shared = False
+        self.__views = {}
 
     def duplicate(self):
-        return copy.deepcopy(self)
+        new_obj = self.__class__.__new__(self.__class__)
+        new_obj.__config = self.__config
+        new_obj.__defs = self.__defs
+        new_obj.__values = self.__values
+        new_obj.__views = {}
+        # Both bundles now share the same definitions and values. The first one modifying them makes its own copy.
+        new_obj.__defs_shared = self.__defs_shared = True
+        new_obj.__values_shared = self.__values_shared = True
+        return new_obj
 
     def translate(self, value):
         """
@@ -263,17 +1015,15 @@ class FragBundle(object):
         """
         for tag in list(set(re.findall('<[a-z_]*>', value))):
             key = tag[1:-1]
-            if key in self.__frags:
-                if self.__frags[key].value() == None:
+            if key in self.__defs:
+                if self.__values.get(key) == None:
                     raise ValueError('The following frag does not have a value assigned to it: {}'.format(key))
-                value = value.replace(tag, self.__frags[key].value())
+                value = value.replace(tag, self.__values[key])
         return value
 
     def info(self, include_empty=True):
         # Extract the labels and frag values
-        labels, frags = zip(*[(self.__frags[key].label(), self.__frags[key]) for key in self.__frags])
-        # Extract the values from the frags. Convert the None to a string representation
-        values = [i.value() for i in frags]
+        labels, values = zip(*[(self.__defs[key].label(), self.__values.get(key)) for key in self.__defs])
         result = ''
         max_len = len(max(labels, key=lambda x: len(x)))
         for label, value in zip(labels, values):
@@ -295,3 +1045,11 @@ class FragBundle(object):
     #             elif frag.value() != other(frag.id()).value(): # not the same value
     #                 return False
     #     return True
+
+def _clear_caches(old, new):
+    """Remove everything compiled from a previous config generation"""
+    _matchers.clear()
+    _levels_cache.clear()
+    _frag_defs_cache.clear()
+
+ovfx.cfg.on_reload(_clear_caches)
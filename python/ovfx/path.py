@@ -5,10 +5,121 @@ Eg. Sequence of files
     File and directory editing/navigation
 """
 
+import array
+import bisect
 import os
 import re
+import fnmatch
 import glob
 import shutil
+import stat
+import threading
+import time
+
+from ovfx import stats
+from ovfx import usage
+
+class StatCache(object):
+
+    def __init__(self, ttl=2.0, max_entries=100000):
+        """
+        Stat results shared by all the Path and Seq objects of the process.
+
+        A result is reused for ttl seconds. The missing paths are cached too.
+        The hits and misses are counted to measure how useful the cache is.
+
+        Args:
+            ttl          : Number of seconds a stat result stays valid
+            max_entries  : The expired entries are dropped when the cache grows bigger.
+                           Everything is dropped if that is not enough.
+        """
+        self.__ttl = ttl
+        self.__max_entries = max_entries
+        self.__entries = {}
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} object "ttl={} entries={} hits={} misses={}" at {}>'.format(cl.__module__, cl.__name__, self.__ttl, len(self.__entries), self.hits, self.misses, hex(id(self)))
+        return result
+
+    def ttl(self):
+        return self.__ttl
+
+    def stat(self, path):
+        """Return the os.stat result of a path or None when it does not exist"""
+        now = time.monotonic()
+        entry = self.__entries.get(path)
+        if entry is not None and entry[0] > now:
+            with self.__lock:
+                self.hits += 1
+            return entry[1]
+        result = _os_stat(path)
+        with self.__lock:
+            self.misses += 1
+            if len(self.__entries) >= self.__max_entries:
+                self.__entries = dict((k, v) for k, v in self.__entries.items() if v[0] > now)
+                if len(self.__entries) >= self.__max_entries:
+                    self.__entries = {}
+            self.__entries[path] = (now + self.__ttl, result)
+        return result
+
+    def invalidate(self, path):
+        """Forget the stat result of a path"""
+        with self.__lock:
+            self.__entries.pop(path, None)
+
+    def clear(self):
+        """Forget everything and reset the counters"""
+        with self.__lock:
+            self.__entries = {}
+            self.hits = 0
+            self.misses = 0
+
+def _os_stat(path):
+    # Same errors as os.path.exists, a path which cannot be stat is reported as missing
+    try:
+        return os.stat(path) if not stats.enabled else stats.call('fs.stat', os.stat, path)
+    except (OSError, ValueError):
+        return None
+
+_stat_cache = None
+if os.getenv('OVFX_STAT_CACHE_TTL'):
+    _stat_cache = StatCache(float(os.getenv('OVFX_STAT_CACHE_TTL')))
+
+def enable_stat_cache(ttl=2.0):
+    """
+    Share the stat results between all the Path and Seq objects of the process for ttl seconds.
+
+    It can also be enabled with the OVFX_STAT_CACHE_TTL variable. Only use it when the
+    tools can live with results a few seconds old, like the browsers.
+
+    Returns:
+        The StatCache object to check the hits and misses.
+    """
+    global _stat_cache
+    _stat_cache = StatCache(ttl)
+    return _stat_cache
+
+def disable_stat_cache():
+    global _stat_cache
+    _stat_cache = None
+
+def stat_cache():
+    """Return the shared StatCache object or None when it is disabled"""
+    return _stat_cache
+
+def _stat(path):
+    """Return the os.stat result of a path or None when it does not exist, from the shared cache when enabled"""
+    cache = _stat_cache
+    if cache is not None:
+        return cache.stat(path)
+    return _os_stat(path)
+
+# Not queried yet
+_UNKNOWN = object()
 
 class Path(object):
 
@@ -44,34 +155,80 @@ class Path(object):
             if path[-1] == '/': # remove the last / to unify the syntax internally
                 path = path[:-1]
             self.__path = path
+        self.__stat = _UNKNOWN
+        self.__entry = None
+
+    @classmethod
+    def _from_entry(cls, entry):
+        """Create a Path from an os.DirEntry. Its type and stat information are reused."""
+        result = cls(entry.path)
+        result.__entry = entry
+        return result
+
+    def stat(self):
+        """
+        Return the os.stat result of the path or None when it does not exist.
+
+        The file system is only queried once per object. Use refresh() to query it again.
+        """
+        if self.__stat is _UNKNOWN:
+            if self.__entry is not None:
+                try:
+                    self.__stat = self.__entry.stat() if not stats.enabled else stats.call('fs.stat', self.__entry.stat)
+                except (FileNotFoundError, NotADirectoryError):
+                    self.__stat = None
+            else:
+                self.__stat = _stat(self.__path)
+        return self.__stat
+
+    def __entry_type(self):
+        """Return the DirEntry of the listing when its type can be used without a stat"""
+        entry = self.__entry
+        if entry is not None and self.__stat is _UNKNOWN and not entry.is_symlink():
+            return entry
+        return None
+
+    def refresh(self):
+        """
+        Forget the stat result so the next call queries the file system again
+        """
+        self.__stat = _UNKNOWN
+        self.__entry = None
+        cache = _stat_cache
+        if cache is not None:
+            cache.invalidate(self.__path)
 
     def exists(self):
         """
         Return whether or not this path exists
         """
-        return os.path.exists(self.__path)
+        if self.__entry_type() is not None:
+            return True
+        return self.stat() is not None
 
     def is_file(self):
         """
         Return whether the path is a file
         """
-        if not self.exists(): # We need to be sure the path exists.
+        entry = self.__entry_type()
+        if entry is not None:
+            return entry.is_file()
+        result = self.stat()
+        if result is None: # We need to be sure the path exists.
             raise OSError('The following path does not exist. {}'.format(self.__path))
-        result = False
-        if os.path.isfile(self.__path):
-            result = True
-        return result
+        return stat.S_ISREG(result.st_mode)
 
     def is_dir(self):
         """
         Return whether the path is a directory
         """
-        if not self.exists(): # We need to be sure the path exists.
+        entry = self.__entry_type()
+        if entry is not None:
+            return entry.is_dir()
+        result = self.stat()
+        if result is None: # We need to be sure the path exists.
             raise OSError('The following path does not exist. {}'.format(self.__path))
-        result = False
-        if os.path.isdir(self.__path):
-            result = True
-        return result
+        return stat.S_ISDIR(result.st_mode)
 
     def parent(self, level=1):
         """
@@ -107,17 +264,124 @@ class Path(object):
                 raise OSError('Cannot create a folder. A file already exists with the following path. {}'.format(self.__path))
         else:
             os.makedirs(self.__path)
+            self.refresh()
 
     def size(self, human_readable=True, decimal_number=1):
+        """
+        Return the size of the file or the total size of all the files under the directory
+
+        The directories are measured by the shared ovfx.usage.DiskUsage object.
+        """
         if self.is_file():
-            size = os.stat(self.__path).st_size
-            if human_readable:
-                size = self.format_size(size, decimal_number=decimal_number)
-            return size
+            size = self.stat().st_size
+        else:
+            size = usage.default().directory(self.__path)[0]
+        if human_readable:
+            size = self.format_size(size, decimal_number=decimal_number)
+        return size
 
     def list(self):
         if self.is_dir():
-            return [Path('{}/{}'.format(self.__path, p)) for p in os.listdir(self.__path)]
+            return list(self.iterdir())
+
+    def asize(self, human_readable=True, decimal_number=1, timeout=None):
+        """
+        Async version of size() running in the pool of ovfx.aio
+        """
+        from ovfx import aio
+        return aio.run(self.size, human_readable, decimal_number, timeout=timeout)
+
+    def iterdir(self, pattern=None, filter=None):
+        """
+        Return a generator of the Path objects inside this directory.
+
+        The directory is read once with os.scandir and the type of each entry comes with the
+        listing, so is_file() and is_dir() on the children don't query the file system again.
+
+        Args:
+            pattern  : Optional shell pattern the names must match. Eg. '*.exr'
+            filter   : Optional function called with each Path. It is skipped when it returns False.
+
+        Examples:
+            import ovfx.path
+            for path in ovfx.path.Path('/path/to/render/v001').iterdir('*.exr'):
+                print(path.name())
+        """
+        with (os.scandir(self.__path) if not stats.enabled else stats.call('fs.listdir', os.scandir, self.__path)) as entries:
+            for entry in entries:
+                if pattern is not None and not fnmatch.fnmatchcase(entry.name, pattern):
+                    continue
+                path = Path._from_entry(entry)
+                if filter is not None and not filter(path):
+                    continue
+                yield path
+
+    def aiterdir(self, pattern=None, filter=None, chunk_size=64, timeout=None):
+        """
+        Async version of iterdir(). The directory is read by chunks in the pool of ovfx.aio
+        so the first Path objects are available before the whole directory is read.
+
+        Args:
+            chunk_size  : Number of entries read at a time
+            timeout     : Number of seconds to wait for each chunk. No limit when None.
+
+        Raises:
+            asyncio.TimeoutError : When the timeout is reached
+
+        Examples:
+            import ovfx.path
+            async for path in ovfx.path.Path('/path/to/render/v001').aiterdir('*.exr', timeout=5):
+                print(path.name())
+        """
+        from ovfx import aio
+        return aio.iterate(lambda: self.iterdir(pattern, filter), chunk_size, timeout)
+
+    def walk(self, max_depth=None, pattern=None, filter=None, prune=None, follow_symlinks=False):
+        """
+        Return a generator of the Path objects under this directory, sub directories included.
+
+        The directories are read with os.scandir like iterdir(). A directory is yielded
+        before its content. The directories which cannot be read are skipped.
+
+        Args:
+            max_depth        : Number of levels to go down. 1 only lists this directory. No limit when None.
+            pattern          : Optional shell pattern the names must match to be yielded.
+                               The directories are still walked through when they don't match.
+            filter           : Optional function called with each Path. It is not yielded when it returns False.
+            prune            : Optional function called with each directory Path. Its content is skipped when it returns True.
+            follow_symlinks  : Walk through the symbolic links to directories
+
+        Examples:
+            import ovfx.path
+            for path in ovfx.path.Path('/mnt/prod/projects/MyProject').walk(max_depth=3, pattern='*.hip'):
+                print(path.path())
+        """
+        stack = [(self.__path, 1)]
+        while stack:
+            directory, depth = stack.pop()
+            sub_dirs = []
+            try:
+                with (os.scandir(directory) if not stats.enabled else stats.call('fs.listdir', os.scandir, directory)) as entries:
+                    for entry in entries:
+                        path = Path._from_entry(entry)
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+                        except OSError:
+                            is_dir = False
+                        if (pattern is None or fnmatch.fnmatchcase(entry.name, pattern)) and (filter is None or filter(path)):
+                            yield path
+                        if is_dir and (max_depth is None or depth < max_depth) and not (prune is not None and prune(path)):
+                            sub_dirs.append(entry.path)
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                continue
+            stack.extend((sub_dir, depth + 1) for sub_dir in reversed(sub_dirs))
+
+    def awalk(self, max_depth=None, pattern=None, filter=None, prune=None, follow_symlinks=False, chunk_size=64, timeout=None):
+        """
+        Async version of walk(). See aiterdir() for chunk_size and timeout.
+        """
+        from ovfx import aio
+        return aio.iterate(lambda: self.walk(max_depth, pattern, filter, prune, follow_symlinks), chunk_size, timeout)
 
     def name(self):
         """
@@ -126,6 +390,220 @@ class Path(object):
         if self.exists():
             return os.path.basename(self.__path)
 
+class FrameSet(object):
+    """
+    Sorted set of unique integer frames.
+
+    The frames are stored in an array so even a huge set stays compact. The first and
+    last frames are O(1) and the membership test is a binary search.
+    It can be created from and converted to a range string like 1001-1200x2,1300.
+    """
+
+    def __init__(self, frames=None):
+        """
+        Args:
+            frames : Any iterable of integers. They don't need to be sorted or unique.
+        """
+        values = sorted(set(frames)) if frames is not None else []
+        self.__frames = array.array('q', values)
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} object "{}" at {}>'.format(cl.__module__, cl.__name__, self.range_string(), hex(id(self)))
+        return result
+
+    def __str__(self):
+        return self.range_string()
+
+    def __len__(self):
+        return len(self.__frames)
+
+    def __iter__(self):
+        return iter(self.__frames)
+
+    def __contains__(self, frame):
+        index = bisect.bisect_left(self.__frames, frame)
+        return index < len(self.__frames) and self.__frames[index] == frame
+
+    def __eq__(self, other):
+        if type(self) == type(other):
+            return self.__frames == other.__frames
+        return NotImplemented
+
+    @classmethod
+    def parse(cls, value):
+        """
+        Create a FrameSet from a range string
+
+        Each comma separated item is a frame (1001), a range (1001-1200) or a range with a step (1001-1200x2).
+
+        Raises:
+            ValueError : When the string is not a valid range string
+        """
+        frames = []
+        for item in value.replace(' ', '').split(','):
+            if not item:
+                continue
+            match = _RANGE_REGEX.match(item)
+            if not match:
+                raise ValueError('The following frame range is invalid: {}'.format(item))
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) is not None else start
+            step = int(match.group(3)) if match.group(3) is not None else 1
+            if step < 1 or end < start:
+                raise ValueError('The following frame range is invalid: {}'.format(item))
+            frames.extend(range(start, end + 1, step))
+        return cls(frames)
+
+    def frames(self):
+        """Return the frames as a list of integers"""
+        return self.__frames.tolist()
+
+    def _copy(self):
+        result = FrameSet()
+        result.__frames = self.__frames[:]
+        return result
+
+    def _add(self, frame):
+        """Add a frame in place. Appending after the last frame is O(1)."""
+        frames = self.__frames
+        if not frames or frame > frames[-1]:
+            frames.append(frame)
+            return
+        index = bisect.bisect_left(frames, frame)
+        if frames[index] != frame:
+            frames.insert(index, frame)
+
+    def _discard(self, frame):
+        """Remove a frame in place when it is part of the set"""
+        frames = self.__frames
+        index = bisect.bisect_left(frames, frame)
+        if index < len(frames) and frames[index] == frame:
+            del frames[index]
+
+    def first(self):
+        if self.__frames:
+            return self.__frames[0]
+
+    def last(self):
+        if self.__frames:
+            return self.__frames[-1]
+
+    def missing(self, first=None, last=None):
+        """
+        Return the frames missing from this set as a FrameSet
+
+        Args:
+            first, last : Range to check. The first and last frames of this set by default.
+        """
+        if not self.__frames and (first is None or last is None):
+            return FrameSet()
+        first = self.first() if first is None else first
+        last = self.last() if last is None else last
+        result = []
+        for start, end in self.gaps(first, last):
+            result.extend(range(start, end + 1))
+        return FrameSet(result)
+
+    def gaps(self, first=None, last=None):
+        """
+        Return the missing ranges as a list of inclusive (start, end) tuples
+
+        Only the holes are iterated over so it stays fast on large sets with few holes.
+        """
+        frames = self.__frames
+        if not frames and (first is None or last is None):
+            return []
+        first = frames[0] if first is None else first
+        last = frames[-1] if last is None else last
+        result = []
+        expected = first
+        i = bisect.bisect_left(frames, first)
+        end = bisect.bisect_right(frames, last)
+        while i < end:
+            start = frames[i]
+            if start > expected:
+                result.append((expected, start - 1))
+            # Jump to the end of the contiguous run starting at i. The frames are unique so
+            # frames[j] - start == j - i holds exactly up to the last frame of the run.
+            low, high = i, end - 1
+            while low < high:
+                middle = (low + high + 1) // 2
+                if frames[middle] - start == middle - i:
+                    low = middle
+                else:
+                    high = middle - 1
+            expected = frames[low] + 1
+            i = low + 1
+        if expected <= last:
+            result.append((expected, last))
+        return result
+
+    def ranges(self):
+        """
+        Return the frames as a list of inclusive (start, end, step) tuples
+
+        A run needs at least 3 frames to use a step bigger than 1.
+        """
+        frames = self.__frames
+        result = []
+        i = 0
+        count = len(frames)
+        while i < count:
+            start = frames[i]
+            if i + 1 == count:
+                result.append((start, start, 1))
+                break
+            step = frames[i + 1] - start
+            j = i + 1
+            while j + 1 < count and frames[j + 1] - frames[j] == step:
+                j += 1
+            if step == 1 or j - i >= 2:
+                result.append((start, frames[j], step))
+                i = j + 1
+            else:
+                result.append((start, start, 1))
+                i += 1
+        return result
+
+    def range_string(self):
+        """Return the frames as a range string like 1001-1200x2,1300"""
+        result = []
+        for start, end, step in self.ranges():
+            if start == end:
+                result.append('{}'.format(start))
+            elif step == 1:
+                result.append('{}-{}'.format(start, end))
+            else:
+                result.append('{}-{}x{}'.format(start, end, step))
+        return ','.join(result)
+
+_RANGE_REGEX = re.compile('(-?[0-9]+)(?:-(-?[0-9]+)(?:x([0-9]+))?)?$')
+
+def _frame_sort_key(frame):
+    """Sort frames by their numerical value, the non numerical ones at the end"""
+    try:
+        return (0, float(frame), frame)
+    except ValueError:
+        return (1, 0.0, frame)
+
+def _frame_index(frames, frame):
+    """Return where to insert a frame string in a list sorted with _frame_sort_key"""
+    key = _frame_sort_key(frame)
+    if not frames or _frame_sort_key(frames[-1]) < key: # Rendered frames usually come in order
+        return len(frames)
+    low, high = 0, len(frames)
+    while low < high:
+        middle = (low + high) // 2
+        if _frame_sort_key(frames[middle]) < key:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+# Same rule as Seq.set_path to find the frame number in the name of an existing file
+_FRAME_REGEX = re.compile('(.+?)(\\.[.0-9]+)(\\.[^0-9]+)$')
+
 class Seq(object):
 
     def __init__(self, path):
@@ -153,6 +631,9 @@ class Seq(object):
 
                 /rootFolder/someOtherFolder/fileName.%FF.jpg
         """
+        # The file list can be updated in place by a watcher thread. The list and FrameSet handed
+        # out are marked as shared and only copied by the next change, so they are never modified.
+        self.__lock = threading.RLock()
         self.set_path(path)
 
     def __repr__(self):
@@ -161,6 +642,52 @@ class Seq(object):
         return result
 
 
+    @staticmethod
+    def scan(directory):
+        """
+        Find all the sequences of a directory with a single listing of the directory.
+
+        The frame numbers are parsed with the same rule as when a Seq is created from a
+        file name. The returned Seq objects already have their file list so they don't
+        need to query the file system again until a force_refresh.
+
+        Returns:
+            A tuple with the list of Seq objects and the list of files which are not part of a sequence.
+            Both are sorted. Sub directories are ignored.
+
+        Examples:
+            import ovfx.path
+            seqs, others = ovfx.path.Seq.scan('/path/to/render/v001')
+            for seq in seqs:
+                print(seq.path(include_range=True))
+        """
+        directory = directory.rstrip('/') or '/'
+        groups = {}
+        others = []
+        with (os.scandir(directory) if not stats.enabled else stats.call('fs.listdir', os.scandir, directory)) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                path = os.path.join(directory, entry.name)
+                match = _FRAME_REGEX.search(path)
+                if match:
+                    key = (match.group(1), match.group(3))
+                    if key in groups:
+                        groups[key].append(path)
+                    else:
+                        groups[key] = [path]
+                else:
+                    others.append(path)
+
+        sequences = []
+        for key in sorted(groups):
+            files = sorted(groups[key])
+            seq = Seq(files[0])
+            seq._set_files(files)
+            sequences.append(seq)
+        others.sort()
+        return sequences, others
+
     def set_path(self, path):
 
         pre_group = '(.+?)' # Any single character or more ending with a .
@@ -188,6 +715,9 @@ class Seq(object):
             self.__is_seq = False
 
         self.__raw_path = path
+        self.__frame_cache = None
+        self.__files_shared = False
+        self.__frame_set_shared = False
         self.__valid_list = False # Reset the internal list status to tell it needs to requery the file system
 
     def path(self, format='%04d', frame=None, include_range=False, range_format=' ({}-{})', force_refresh=False):
@@ -247,26 +777,144 @@ class Seq(object):
         """
         Rebuild the file list from the file system based on the pre and post file segments
         """
-        if not self.__valid_list or force_refresh: # Only do the following if the list needs to be rebuilt
-            if not self.__is_seq:
-                self.__file_list = glob.glob(self.__raw_path)
+        with self.__lock:
+            if not self.__valid_list or force_refresh: # Only do the following if the list needs to be rebuilt
+                if not self.__is_seq:
+                    pattern = self.__raw_path
+                else:
+                    pattern = '%s*%s' % (self.__pre_frame, self.__post_frame)
+                file_list = glob.glob(pattern) if not stats.enabled else stats.call('fs.glob', glob.glob, pattern)
+                if self.__is_seq:
+                    file_list.sort()
+                    # Loop through files and filter out the ones without a numerical frame
+                    filtered_list = []
+                    for f in file_list:
+                        frame = f.replace(self.__pre_frame, '').replace(self.__post_frame, '')
+                        filtered_list.append(f)
+                    file_list = filtered_list
+                self.__file_list = file_list
+                self.__files_shared = False
+                self.__valid_list = True # Set the status back to a valid list
+                self.__frame_cache = None
+
+    def __build_frames(self, force_refresh=False):
+        """
+        Extract the frames from the file list once per file list.
+
+        The frame strings are sorted by their numerical value and the integer ones are kept in a FrameSet.
+        """
+        with self.__lock:
+            self.__build_list(force_refresh)
+            if self.__frame_cache is None:
+                frames = []
+                if self.__is_seq:
+                    start = len(self.__pre_frame)
+                    end = len(self.__post_frame)
+                    frames = [f[start:len(f) - end] for f in self.__file_list]
+                    frames.sort(key=_frame_sort_key)
+                self.__frame_cache = (frames, FrameSet(int(f) for f in frames if f.isdigit()))
+                self.__frame_set_shared = False
+            return self.__frame_cache
+
+    def _set_files(self, files):
+        """Set the file list found by another query of the file system. It must be sorted."""
+        with self.__lock:
+            self.__file_list = list(files)
+            self.__files_shared = False
+            self.__valid_list = True
+            self.__frame_cache = None
+
+    def _frame_of(self, path):
+        """Return the frame string of a file of this sequence or None when the file is not part of it"""
+        if not self.__is_seq:
+            return '' if path == self.__raw_path else None
+        if len(path) >= len(self.__pre_frame) + len(self.__post_frame) and path.startswith(self.__pre_frame) and path.endswith(self.__post_frame):
+            return path[len(self.__pre_frame):len(path) - len(self.__post_frame)]
+        return None
+
+    def __own_files(self):
+        """Copy the file list before a change when a caller holds it"""
+        if self.__files_shared:
+            self.__file_list = list(self.__file_list)
+            self.__files_shared = False
+
+    def __own_frame_set(self):
+        """Copy the FrameSet before a change when a caller holds it"""
+        frames, frame_set = self.__frame_cache
+        if self.__frame_set_shared:
+            frame_set = frame_set._copy()
+            self.__frame_cache = (frames, frame_set)
+            self.__frame_set_shared = False
+        return frames, frame_set
+
+    def _add_file(self, path):
+        """
+        Insert a new file in the sorted file list. Return whether it was added.
+
+        The frames already extracted are updated in place with the new frame instead of being
+        extracted again. A frame after the last one, the usual case while rendering, is appended.
+        """
+        with self.__lock:
+            self.__build_list()
+            file_list = self.__file_list
+            if file_list and path <= file_list[-1]:
+                index = bisect.bisect_left(file_list, path)
+                if index < len(file_list) and file_list[index] == path:
+                    return False
             else:
-                self.__file_list = glob.glob('%s*%s' % (self.__pre_frame, self.__post_frame) )
-                self.__file_list.sort()
-                # Loop through files and filter out the ones without a numerical frame
-                filtered_list = []
-                for f in self.__file_list:
-                    frame = f.replace(self.__pre_frame, '').replace(self.__post_frame, '')
-                    filtered_list.append(f)
-                self.__file_list = filtered_list
-            self.__valid_list = True # Set the status back to a valid list
+                index = len(file_list)
+            self.__own_files()
+            self.__file_list.insert(index, path)
+            if self.__frame_cache is not None and self.__is_seq:
+                frames, frame_set = self.__own_frame_set()
+                frame = self._frame_of(path)
+                frames.insert(_frame_index(frames, frame), frame)
+                if frame.isdigit():
+                    frame_set._add(int(frame))
+            return True
+
+    def _remove_file(self, path):
+        """Remove a file from the file list. Return whether it was there."""
+        with self.__lock:
+            self.__build_list()
+            file_list = self.__file_list
+            index = bisect.bisect_left(file_list, path)
+            if index == len(file_list) or file_list[index] != path:
+                return False
+            self.__own_files()
+            del self.__file_list[index]
+            if self.__frame_cache is not None and self.__is_seq:
+                frames, frame_set = self.__own_frame_set()
+                frame = self._frame_of(path)
+                index = _frame_index(frames, frame)
+                del frames[index]
+                if frame.isdigit():
+                    # Another padding of the same frame number, like 1 and 01, sorts next to it
+                    number = int(frame)
+                    others = frames[max(index - 1, 0):index + 1]
+                    if not any(other.isdigit() and int(other) == number for other in others):
+                        frame_set._discard(number)
+            return True
 
     def files(self, force_refresh=False):
         """
         Return all filenames
         """
-        self.__build_list(force_refresh)
-        return self.__file_list
+        with self.__lock:
+            self.__build_list(force_refresh)
+            self.__files_shared = True
+            return self.__file_list
+
+    def afiles(self, force_refresh=False, timeout=None):
+        """
+        Async version of files() running in the pool of ovfx.aio
+
+        Examples:
+            import ovfx.path
+            files = await ovfx.path.Seq('/path/to/file.1001.exr').afiles(timeout=10)
+        """
+        from ovfx import aio
+        return aio.run(self.files, force_refresh, timeout=timeout)
 
     def count(self, force_refresh=False):
         """
@@ -278,54 +926,110 @@ class Seq(object):
     def frames(self, force_refresh=False):
         """
         Return the file frames found in the sequence
+
+        The frames are strings as found in the file names, padding included,
+        sorted by their numerical value. Use frame_set() to get them as integers.
         """
-        # if force_refresh:
-        self.__build_list(force_refresh)
-        result = []
-        if self.__is_seq:
-            if len(self.__file_list):
-                for f in self.__file_list:
-                    frame = f.replace(self.__pre_frame, '').replace(self.__post_frame, '')
-                    # frame = int(frame)
-                    result.append(frame)
-            result.sort()
+        with self.__lock:
+            return list(self.__build_frames(force_refresh)[0])
 
-        return result
+    def aframes(self, force_refresh=False, timeout=None):
+        """
+        Async version of frames() running in the pool of ovfx.aio
+        """
+        from ovfx import aio
+        return aio.run(self.frames, force_refresh, timeout=timeout)
+
+    def frame_set(self, force_refresh=False):
+        """
+        Return the integer frames found in the sequence as a FrameSet
+
+        Examples:
+            import ovfx.path
+            seq = ovfx.path.Seq('/path/to/render/beauty.1001.exr')
+            print(seq.frame_set())                # 1001-1100,1102-1200
+            print(seq.missing_frames().frames())  # [1101]
+        """
+        with self.__lock:
+            frame_set = self.__build_frames(force_refresh)[1]
+            self.__frame_set_shared = True
+            return frame_set
+
+    def missing_frames(self, force_refresh=False):
+        """
+        Return the frames missing between the first and last frame as a FrameSet
+        """
+        return self.frame_set(force_refresh).missing()
 
     def first_frame(self, force_refresh=False):
         """
         Return the sequence index from the first file in the sequence
         """
-        frames = self.frames(force_refresh)
-        if frames:
-            return frames[0]
+        with self.__lock:
+            frames = self.__build_frames(force_refresh)[0]
+            if frames:
+                return frames[0]
 
     def last_frame(self, force_refresh=False):
         """
         Return the sequence index from the last file in the sequence
         """
-        # We need to get all the frames first because looking directly self.__file_list
-        # will return .9.ext as a higher frame than .10.ext
-        frames = self.frames(force_refresh)
-        if frames:
-            return frames[-1]
+        with self.__lock:
+            frames = self.__build_frames(force_refresh)[0]
+            if frames:
+                return frames[-1]
 
     def frame_range(self, force_refresh=False):
         """
         Return the sequence index from the first and last file in the sequence
         """
-        frames = self.frames(force_refresh)
-        if frames:
-            return (frames[0], frames[-1])
+        with self.__lock:
+            frames = self.__build_frames(force_refresh)[0]
+            if frames:
+                return (frames[0], frames[-1])
+
+    def paths(self, frames=None, format='%04d', force_refresh=False):
+        """
+        Return a generator of the path of each frame
+
+        Args:
+            frames:              A FrameSet, a range string like 1001-1200x2 or any iterable of integers.
+                                 The frames found on disk when None.
+            format:              Valid %d syntax used for the frame number. Eg. %04d, %d.
+
+        Examples:
+            import ovfx.path
+            seq = ovfx.path.Seq('/path/to/render/beauty.%04d.exr')
+            missing = list(seq.paths(seq.missing_frames()))
+        """
+        if not self.__is_seq:
+            raise TypeError('Cannot output the frames of a single file: {}'.format(self.__raw_path))
+        if frames is None:
+            frames = self.frame_set(force_refresh)
+        elif type(frames) == str:
+            frames = FrameSet.parse(frames)
+        try:
+            format % 0
+        except TypeError: # This means the format didn't have any effect
+            raise TypeError(format + ' is not a valid format for outputing a frame number. Format must be with the %d syntax.')
+        template = self.__pre_frame.replace('%', '%%') + format + self.__post_frame.replace('%', '%%')
+        return (template % frame for frame in frames)
 
     def size(self, human_readable=True, decimal_number=1):
-        accum_size = 0
-        for file in self.files():
-            accum_size += os.stat(file).st_size
+        # The files are stat in parallel by the shared ovfx.usage.DiskUsage object
+        # and go through the shared stat cache when it is enabled
+        accum_size = usage.default().files(self.files(), stat=_stat)[0]
         if human_readable:
             accum_size = Path.format_size(accum_size, decimal_number=decimal_number)
         return accum_size
 
+    def asize(self, human_readable=True, decimal_number=1, timeout=None):
+        """
+        Async version of size() running in the pool of ovfx.aio
+        """
+        from ovfx import aio
+        return aio.run(self.size, human_readable, decimal_number, timeout=timeout)
+
 # def copy_file(source, destination):
 #     """
 #     Copy a file using the shutil.copyfile but create intermediate
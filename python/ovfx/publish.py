@@ -0,0 +1,186 @@
+"""
+Copy engine used to publish sequences.
+
+The publish flow extracts the context of the source files with a source location
+model and applies it to a target location model. This module does the copy step:
+the destination folders are created once and the frames are copied concurrently
+by a bounded pool of threads.
+
+Each frame is written to a temporary name in the destination folder and renamed
+when complete, so a destination file is either absent or complete. The copy uses
+a reflink when the file system supports it, otherwise copy_file_range or sendfile
+so the data does not go through Python. A publish can be resumed: the frames
+already copied with the same size and modification time are skipped.
+"""
+
+import collections
+import concurrent.futures
+import errno
+import fcntl
+import os
+import shutil
+
+import ovfx.path
+from ovfx import exceptions as ex
+from ovfx import stats
+
+# ioctl request to clone a file on Linux file systems supporting reflinks (btrfs, xfs)
+_FICLONE = 0x40049409
+
+COPIED = 'copied'
+SKIPPED = 'skipped'
+
+def copy_seq(seq, target, source, workers=8, resume=True, callback=None):
+    """
+    Copy all the files of a sequence to the paths of the target location model.
+
+    The context of each file is extracted with the source location model. The target
+    path uses the values of the target bundle when they are set, otherwise the value
+    extracted from the source file. That way a publish can for example change the version.
+
+    Args:
+        seq       : ovfx.path.Seq object of the source files
+        target    : ovfx.loc.Location object of the destination model
+        source    : ovfx.loc.Location object of the source model
+        workers   : Maximum number of files copied at the same time
+        resume    : Skip the destination files already complete. Otherwise they are copied again.
+        callback  : Optional function called with (source path, target path, status) after each file.
+                    It is called from the worker threads.
+
+    Returns:
+        A list of (source path, target path, status) tuples where status is COPIED or SKIPPED.
+
+    Raises:
+        InvalidFormat : When a source file does not match the source model
+        NotFound      : When a tag of the target model gets no value. Nothing is copied.
+        OSError       : When a copy fails. The other files are still copied first.
+
+    Examples:
+        import ovfx.loc
+        import ovfx.path
+        import ovfx.publish
+        source = ovfx.loc.Location(['software', 'render', 'image', 'shot'])
+        target = ovfx.loc.Location(['publish', 'render', 'image', 'shot'])
+        seq = ovfx.path.Seq('/mnt/prod/projects/MyProject/E400/Seq_010/0010/3D/houdini/render/fx_fire/v043/MyProject_E400_Seq_010_0010_fx_fire_v043.1001.tif')
+        ovfx.publish.copy_seq(seq, target, source)
+    """
+    files = seq.files()
+    pairs = []
+    for batch in source.extract_many(files):
+        for path, valid in zip(batch.paths(), batch.valid()):
+            if not valid:
+                raise ex.InvalidFormat('The following file does not match the source location model {}: {}'.format(source.model(), path))
+        # The values set on the target bundle win over the extracted ones
+        columns = dict((tag, column) for tag, column in batch.columns().items()
+                       if target.bundle(tag) is not None and target.bundle(tag).value() is None)
+        # Never invent a destination path, every tag needs a value
+        missing = [tag for tag in collections.OrderedDict.fromkeys(target.tags()) if tag not in columns and
+                   (target.bundle(tag) is None or target.bundle(tag).value() is None)]
+        if missing:
+            raise ex.NotFound('The following tags of the target location model {} get no value from the source files or the target bundle: {}'.format(target.model(), ', '.join(missing)))
+        pairs.extend(zip(batch.paths(), target.paths(aligned=True, **columns)))
+    return copy_files(pairs, workers=workers, resume=resume, callback=callback)
+
+def copy_files(pairs, workers=8, resume=True, callback=None):
+    """
+    Copy a list of (source path, target path) pairs concurrently.
+
+    The destination folders are created once before copying. See copy_seq() for the arguments.
+    """
+    pairs = list(pairs)
+    for folder in sorted(set(os.path.dirname(target) for source, target in pairs)):
+        try:
+            ovfx.path.Path(folder).create_folder()
+        except OSError as error:
+            if error.errno != errno.EEXIST: # Created by another process at the same time
+                raise
+
+    def copy(pair):
+        source, target = pair
+        status = SKIPPED if resume and is_complete(source, target) else None
+        if status is None:
+            copy_file(source, target)
+            status = COPIED
+        if callback is not None:
+            callback(source, target, status)
+        return source, target, status
+
+    result = []
+    errors = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        copy = copy if not stats.enabled else stats.bind(copy)
+        futures = [executor.submit(copy, pair) for pair in pairs]
+        for future in futures:
+            try:
+                result.append(future.result())
+            except OSError as error:
+                errors.append(error)
+    if errors:
+        raise errors[0]
+    return result
+
+@stats.helper
+def is_complete(source, target):
+    """Return whether the target is a complete copy of the source, same size and modification time"""
+    try:
+        source_stat = os.stat(source) if not stats.enabled else stats.call('fs.stat', os.stat, source)
+        target_stat = os.stat(target) if not stats.enabled else stats.call('fs.stat', os.stat, target)
+    except OSError:
+        return False
+    return source_stat.st_size == target_stat.st_size and int(source_stat.st_mtime) == int(target_stat.st_mtime)
+
+@stats.helper
+def copy_file(source, target):
+    """
+    Copy a file atomically with the fastest method supported by the file system.
+
+    The data is written to a temporary file next to the target which is renamed once complete.
+    The permissions and modification time of the source are copied too.
+    """
+    temp = os.path.join(os.path.dirname(target), '.{}.{}.tmp'.format(os.path.basename(target), os.getpid()))
+    try:
+        with open(source, 'rb') as source_file, open(temp, 'wb') as temp_file:
+            if not stats.enabled:
+                _copy_data(source_file, temp_file)
+            else:
+                stats.call('fs.copy', _copy_data, source_file, temp_file)
+        shutil.copystat(source, temp)
+        os.replace(temp, target)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+def _copy_data(source_file, target_file):
+    source_fd = source_file.fileno()
+    target_fd = target_file.fileno()
+    try:
+        fcntl.ioctl(target_fd, _FICLONE, source_fd)
+        return
+    except OSError:
+        pass # Reflinks not supported by this file system
+    size = os.fstat(source_fd).st_size
+    offset = 0
+    for function in (getattr(os, 'copy_file_range', None), getattr(os, 'sendfile', None)):
+        if function is None:
+            continue
+        try:
+            if function is os.sendfile:
+                os.lseek(target_fd, offset, os.SEEK_SET) # sendfile writes at the current position
+            while offset < size:
+                if function is os.sendfile:
+                    copied = os.sendfile(target_fd, source_fd, offset, size - offset)
+                else:
+                    copied = function(source_fd, target_fd, size - offset, offset, offset)
+                if not copied:
+                    break
+                offset += copied
+            if offset >= size:
+                return
+        except OSError as error:
+            if error.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP):
+                raise
+    # Fallback for what is left to copy
+    source_file.seek(offset)
+    target_file.seek(offset)
+    shutil.copyfileobj(source_file, target_file)
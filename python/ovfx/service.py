@@ -0,0 +1,126 @@
+"""
+Batch evaluation of the location models.
+
+These functions do the work of the ovfx daemon and of the ovfx client when no daemon
+is running. They take and return plain lists and dictionaries so the results can be
+sent as JSON.
+
+The models are given as their keys in the location configuration, either as a list
+like ['software', 'render', 'image', 'shot'] or joined with slashes like
+'software/render/image/shot'.
+
+The Location and LocationIndex objects are shared by all the threads of the process
+and rebuilt when the config is reloaded, so the compiled matchers stay warm between
+the calls and the client connections. The functions only read them.
+"""
+
+import collections
+import threading
+
+import ovfx.cfg
+import ovfx.loc
+
+_lock = threading.Lock()
+_generation = None
+_locations = {}
+_indexes = {}
+
+def keys(model):
+    """Return the list of keys of a model given as a list or a string joined with slashes"""
+    if isinstance(model, str):
+        return [key for key in model.split('/') if key]
+    return list(model)
+
+def _caches():
+    """Return the (locations, indexes) caches of the process for the current config generation"""
+    global _generation, _locations, _indexes
+    generation = ovfx.cfg.current()
+    with _lock:
+        if _generation is not generation:
+            _locations = {}
+            _indexes = {}
+            _generation = generation
+        return _locations, _indexes
+
+def _location(model):
+    locations, indexes = _caches()
+    model_keys = tuple(keys(model))
+    location = locations.get(model_keys)
+    if location is None:
+        # Built outside of the lock. When two threads build the same one, the first stored is kept.
+        location = ovfx.loc.Location(list(model_keys))
+        with _lock:
+            location = locations.setdefault(model_keys, location)
+    return location
+
+def _index(models):
+    locations, indexes = _caches()
+    key = tuple(tuple(keys(model)) for model in models) if models is not None else None
+    index = indexes.get(key)
+    if index is None:
+        index = ovfx.loc.LocationIndex([list(model_keys) for model_keys in key] if key is not None else None)
+        with _lock:
+            index = indexes.setdefault(key, index)
+    return index
+
+def extract(model, paths):
+    """
+    Return the context of each path as a dictionary of fragment values, None when the path does not match the model
+    """
+    result = []
+    for batch in _location(model).extract_many(paths):
+        for index, valid in enumerate(batch.valid()):
+            result.append(dict(batch.context(index)) if valid else None)
+    return result
+
+def translate(source, target, paths, values=None):
+    """
+    Return the target path of each source path, None when the path does not match the source model
+    or a fragment of the target model has no value.
+
+    Args:
+        values  : Optional fragment values overriding the extracted ones. Eg. {'ver': '044'}
+
+    Raises:
+        NotFound      : When a fragment id of values does not exist
+        InvalidFormat : When a value does not match its fragment regex
+    """
+    source_location = _location(source)
+    target_location = _location(target)
+    values = values or {}
+    # Validate the values once and use the same template for every path like Location.paths
+    bundle = ovfx.loc.FragBundle()
+    bundle.set_value(**values)
+    variables = [tag for tag in collections.OrderedDict.fromkeys(target_location.tags()) if bundle(tag) is not None]
+    template = ovfx.loc._formatter(target_location.model()).template(bundle, variables)
+    result = []
+    for batch in source_location.extract_many(paths):
+        size = len(batch)
+        extracted = batch.columns()
+        columns = [[values[tag]] * size if tag in values else extracted.get(tag, [None] * size) for tag in variables]
+        for index, valid in enumerate(batch.valid()):
+            row = [column[index] for column in columns]
+            if not valid or None in row:
+                result.append(None)
+            else:
+                result.append(template.format(*row))
+    return result
+
+def path(model, contexts):
+    """Return the path of the model built from each context dictionary"""
+    location = _location(model)
+    return [location.path(**context) for context in contexts]
+
+def classify(paths, exact=False, models=None):
+    """
+    Return the list of matching (model keys, context) pairs of each path. See ovfx.loc.LocationIndex.classify.
+    """
+    index = _index(models)
+    return [[[list(model_keys), dict(context)] for model_keys, context in index.classify(path, exact)] for path in paths]
+
+OPERATIONS = {
+    'extract': extract,
+    'translate': translate,
+    'path': path,
+    'classify': classify,
+}
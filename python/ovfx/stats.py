@@ -0,0 +1,207 @@
+"""
+Opt-in instrumentation of the framework.
+
+When enabled, the regex compiles and matches, the file system calls, the bundle copies
+and the config loads are counted and timed per call site. The call site is the public
+ovfx function doing the call: the private helpers in between, like the one calling
+os.stat, are skipped so the totals are grouped by the API used by the tool. The work
+done by the pools of threads is recorded under the call site that submitted it.
+It tells where the time of a slow tool goes without a profiler.
+
+The instrumented code checks the module level enabled flag before anything else so
+the overhead is a single attribute lookup when the instrumentation is off.
+
+The categories are:
+    regex.compile, regex.match
+    fs.stat, fs.listdir, fs.glob, fs.copy
+    bundle.copy
+    config.load
+
+Examples:
+    import ovfx.stats
+    ovfx.stats.enable(trace=True)
+    ... # Run the slow publish
+    print(ovfx.stats.report())
+    ovfx.stats.export_trace('/tmp/publish_trace.json') # Open in chrome://tracing or Perfetto
+"""
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+enabled = False
+
+_lock = threading.Lock()
+_totals = {}
+_events = []
+_trace = False
+_max_events = 0
+_start = 0.0
+_helpers = set()
+_local = threading.local()
+_package = __name__.rpartition('.')[0] + '.'
+
+def enable(trace=False, max_events=1000000):
+    """
+    Start counting and timing. The previous results are kept. Use reset() to clear them.
+
+    Args:
+        trace       : Also record each call as a trace event for export_trace()
+        max_events  : Maximum number of trace events kept in memory. The next ones are dropped.
+    """
+    global enabled, _trace, _max_events, _start
+    with _lock:
+        if not _start:
+            _start = time.perf_counter()
+        _trace = trace
+        _max_events = max_events
+        enabled = True
+
+def disable():
+    """Stop counting and timing. The results are kept."""
+    global enabled
+    enabled = False
+
+def reset():
+    """Clear the results and the trace events"""
+    global _totals, _events, _start
+    with _lock:
+        _totals = {}
+        _events = []
+        _start = time.perf_counter() if enabled else 0.0
+
+def helper(func):
+    """
+    Mark a public function as a thin helper. Like the private functions, it is skipped
+    when looking for the call site. It is a decorator returning the function unchanged.
+    """
+    _helpers.add(func.__code__)
+    return func
+
+def bind(func):
+    """
+    Return func recording its calls under the call site of the caller of bind().
+
+    Used for the functions run by a pool of threads, whose stack does not go back to the
+    public function that submitted them. It is func itself when the instrumentation is off.
+
+    Examples:
+        executor.submit(stats.bind(self.__copy), path)
+    """
+    if not enabled:
+        return func
+    site = _site(1)
+
+    def _bound(*args, **kwargs):
+        previous = getattr(_local, 'site', None)
+        _local.site = site
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.site = previous
+    return _bound
+
+def _is_helper(code):
+    name = code.co_name
+    if (name.startswith('_') and not name.endswith('__')) or name.startswith('<') or code in _helpers:
+        return True
+    qualname = getattr(code, 'co_qualname', '')
+    return qualname.startswith('_') or '<locals>' in qualname # Methods of private classes and nested functions
+
+def _site(depth):
+    frame = sys._getframe(depth + 1)
+    # Go up to the first public function, without leaving the package
+    while _is_helper(frame.f_code) and frame.f_back is not None and frame.f_back.f_globals.get('__name__', '').startswith(_package):
+        frame = frame.f_back
+    if _is_helper(frame.f_code):
+        # Only helpers in a thread of a pool. Use the call site that submitted the work.
+        site = getattr(_local, 'site', None)
+        if site is not None:
+            return site
+    return '{}.{}'.format(frame.f_globals.get('__name__'), getattr(frame.f_code, 'co_qualname', frame.f_code.co_name))
+
+def _record(category, site, start, duration):
+    with _lock:
+        total = _totals.get((category, site))
+        if total is None:
+            _totals[(category, site)] = [1, duration]
+        else:
+            total[0] += 1
+            total[1] += duration
+        if _trace and len(_events) < _max_events:
+            _events.append((category, site, start, duration, threading.get_ident()))
+
+def call(category, func, *args, **kwargs):
+    """
+    Call func and record its duration under category for the calling function.
+
+    Meant to be used behind the enabled flag:
+        result = regex.match(path) if not stats.enabled else stats.call('regex.match', regex.match, path)
+    """
+    site = _site(1)
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _record(category, site, start, time.perf_counter() - start)
+
+@contextlib.contextmanager
+def timer(category):
+    """Record the duration of a block of code under category for the calling function"""
+    site = _site(2) # The frames of contextmanager are in between
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(category, site, start, time.perf_counter() - start)
+
+def count(category):
+    """Record an event without duration under category for the calling function"""
+    _record(category, _site(1), time.perf_counter(), 0.0)
+
+def totals():
+    """
+    Return a dictionary of (category, call site) -> (count, seconds)
+    """
+    with _lock:
+        return dict((key, tuple(value)) for key, value in _totals.items())
+
+def report():
+    """
+    Return a table of the totals per category and call site, the slowest categories first.
+    """
+    by_category = {}
+    for (category, site), (number, seconds) in totals().items():
+        by_category.setdefault(category, []).append((seconds, number, site))
+    lines = ['{:<16}{:<52}{:>10}{:>12}{:>10}'.format('Category', 'Call site', 'Count', 'Total (ms)', 'Avg (us)')]
+    for category in sorted(by_category, key=lambda c: -sum(item[0] for item in by_category[c])):
+        for seconds, number, site in sorted(by_category[category], reverse=True):
+            lines.append('{:<16}{:<52}{:>10}{:>12.3f}{:>10.2f}'.format(category, site, number, seconds * 1e3, seconds / number * 1e6))
+    return '\n'.join(lines)
+
+def export_trace(path):
+    """
+    Write the trace events in the Chrome trace event JSON format.
+
+    The file can be opened in chrome://tracing or https://ui.perfetto.dev
+    The events are only recorded when enabled with trace=True.
+    """
+    pid = os.getpid()
+    with _lock:
+        events = list(_events)
+        start = _start
+    trace_events = []
+    for category, site, event_start, duration, tid in events:
+        event = {'name': site, 'cat': category, 'pid': pid, 'tid': tid, 'ts': (event_start - start) * 1e6}
+        if duration:
+            event['ph'] = 'X'
+            event['dur'] = duration * 1e6
+        else:
+            event['ph'] = 'i'
+            event['s'] = 't'
+        trace_events.append(event)
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
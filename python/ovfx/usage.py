@@ -0,0 +1,206 @@
+"""
+Disk usage of directories, file lists and location models.
+
+The files are stat in parallel by a bounded pool of threads which helps a lot on
+network file systems where each stat is a round trip to the server.
+
+The content of each directory is cached with the directory modification time.
+When a report runs again, a directory which did not change only costs one stat
+instead of one per file. Note that overwriting a file in place does not change the
+directory modification time. Use clear() to forget everything when that matters.
+"""
+
+import concurrent.futures
+import os
+import threading
+
+from ovfx import stats
+
+class DiskUsage(object):
+
+    def __init__(self, workers=16):
+        """
+        Args:
+            workers  : Maximum number of threads doing stat calls at the same time
+        """
+        self.__workers = workers
+        self.__executor = None
+        self.__cache = {}
+        self.__lock = threading.Lock()
+
+    def __repr__(self):
+        cl = self.__class__
+        result = '<{}.{} object "Cached directories={}" at {}>'.format(cl.__module__, cl.__name__, len(self.__cache), hex(id(self)))
+        return result
+
+    def __map(self, func, items):
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.__workers)
+        return self.__executor.map(func if not stats.enabled else stats.bind(func), items)
+
+    def clear(self):
+        """Forget the cached content of every directory"""
+        with self.__lock:
+            self.__cache = {}
+
+    def shutdown(self):
+        """Stop the threads. They are started again when needed."""
+        with self.__lock:
+            executor = self.__executor
+            self.__executor = None
+        if executor is not None:
+            executor.shutdown()
+
+    def files(self, paths, stat=None):
+        """
+        Return the (size, count) of a list of files. The missing files are ignored.
+
+        Args:
+            paths  : List of files
+            stat   : Optional function returning the os.stat result of a path or None when it
+                     does not exist. Eg. to go through the stat cache of ovfx.path.
+        """
+        size = 0
+        count = 0
+        func = _file_size if stat is None else lambda path: _stat_size(stat, path)
+        for file_size in self.__map(func, list(paths)):
+            if file_size is not None:
+                size += file_size
+                count += 1
+        return size, count
+
+    def directory(self, path):
+        """
+        Return the (size, count) of all the files found under a directory
+        """
+        path = _normalize(path)
+        return self.tree(path)[path]
+
+    def tree(self, path):
+        """
+        Return a dictionary with the (size, count) of every directory under path, path included.
+
+        The values are the totals of each directory including its sub directories.
+        The symbolic links are not followed.
+        """
+        path = _normalize(path)
+        result = self.__tree(path)
+        if result is None:
+            result = {path: (0, 0)}
+        return result
+
+    def __tree(self, path):
+        """Return the tree() of a directory or None when it is not a directory"""
+        contents = {}
+        level = [path]
+        while level: # Each level of the tree is scanned in parallel
+            next_level = []
+            for directory, content in zip(level, self.__map(self.__content, level)):
+                if content is None: # Deleted while scanning or not a directory
+                    continue
+                contents[directory] = content
+                next_level.extend(content[2])
+            level = next_level
+
+        # Accumulate the totals from the deepest directories up to the root
+        result = {}
+        for directory in sorted(contents, key=lambda d: d.count('/'), reverse=True):
+            size, count, subdirs = contents[directory]
+            for subdir in subdirs:
+                if subdir in result:
+                    sub_size, sub_count = result[subdir]
+                    size += sub_size
+                    count += sub_count
+            result[directory] = (size, count)
+        if path not in result:
+            return None
+        return result
+
+    def __content(self, directory):
+        """Return the (size, count, sub directories) of the files directly inside a directory"""
+        try:
+            mtime = (os.stat(directory) if not stats.enabled else stats.call('fs.stat', os.stat, directory)).st_mtime_ns
+        except OSError:
+            return None
+        cached = self.__cache.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        size = 0
+        count = 0
+        subdirs = []
+        try:
+            with (os.scandir(directory) if not stats.enabled else stats.call('fs.listdir', os.scandir, directory)) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        else:
+                            size += (entry.stat(follow_symlinks=False) if not stats.enabled else stats.call('fs.stat', entry.stat, follow_symlinks=False)).st_size
+                            count += 1
+                    except OSError: # Deleted while scanning
+                        pass
+        except (NotADirectoryError, FileNotFoundError):
+            return None
+        content = (size, count, tuple(subdirs))
+        self.__cache[directory] = (mtime, content)
+        return content
+
+    def report(self, location, id, **values):
+        """
+        Return a generator of the disk usage per fragment value.
+
+        The directories matching the location model up to the fragment are found on disk
+        one model level at a time, like Location.glob, and each one is measured as soon
+        as it is found so the results are streamed. They are not sorted.
+
+        Args:
+            location  : ovfx.loc.Location object
+            id        : Fragment id at the level of the report. Eg. proj, seq or shot.
+            values    : Fixed fragment values to limit the report. Eg. proj='MyProject'
+                        The values already set in the location bundle also limit the report.
+
+        Returns:
+            A generator of (context, size, count) tuples where context is a dictionary
+            with the values of each tag of the model up to the fragment.
+
+        Examples:
+            import ovfx.loc
+            import ovfx.usage
+            loc = ovfx.loc.Location(['software', 'render', 'image', 'shot'])
+            for context, size, count in ovfx.usage.default().report(loc, 'shot', proj='MyProject'):
+                print(context['seq'], context['shot'], ovfx.path.Path.format_size(size))
+        """
+        parent = location.parent(id)
+        parent.bundle.set_value(**values)
+        for path, bundle in parent.glob():
+            tree = self.__tree(_normalize(path)) # None for a file matching the model
+            if tree is None:
+                continue
+            values_found = dict((frag.id(), frag.value()) for frag in bundle.frags())
+            size, count = tree[_normalize(path)]
+            yield values_found, size, count
+
+def _normalize(path):
+    return path.rstrip('/') or '/'
+
+def _stat_size(stat, path):
+    result = stat(path)
+    return result.st_size if result is not None else None
+
+def _file_size(path):
+    try:
+        return (os.stat(path) if not stats.enabled else stats.call('fs.stat', os.stat, path)).st_size
+    except OSError:
+        return None
+
+_default = None
+_default_lock = threading.Lock()
+
+def default():
+    """Return the DiskUsage object shared by the whole process"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = DiskUsage()
+        return _default
@@ -0,0 +1,162 @@
+"""
+Discover on disk everything matching location models.
+
+Instead of walking the whole file system and extracting the context of every file,
+the location models drive the search. Each folder level of a model is either a literal
+name, which needs no listing at all, or a pattern made of the fragments regex. Only the
+entries matching a level are visited further so unrelated directories like _assets
+under a shot model are never listed.
+
+The directories are listed in parallel by a bounded pool of threads and the results
+are streamed as soon as they are found.
+"""
+
+import collections
+import concurrent.futures
+import os
+
+import ovfx.cfg
+import ovfx.loc
+from ovfx import stats
+
+@stats.helper
+def walk(models=None, workers=8, prune=None, **values):
+    """
+    Return a generator of (model keys, context, path) for each path matching the models.
+
+    The whole path must match the model. The context is a dictionary with the value of
+    each tag of the model. When a tag occurs multiple times, the first occurrence is used
+    like with Location.extract_frags. The results are not sorted since the directories
+    are listed in parallel.
+
+    Args:
+        models   : List of model keys like ['software', 'render', 'image', 'shot'].
+                   All the models of the location configuration are used when None.
+        workers  : Maximum number of directories listed at the same time
+        prune    : Optional function called with the model keys and a directory before listing it
+                   for the last level of the model. The directory is skipped when it returns True.
+                   It is called from the worker threads. Eg. to skip directories which did not change.
+        values   : Fixed fragment values to limit the search. Eg. proj='MyProject'
+
+    Raises:
+        NotFound      : When a fragment id of values does not exist
+        InvalidFormat : When a value does not match its fragment regex
+
+    Examples:
+        import ovfx.walk
+        for keys, context, path in ovfx.walk.walk([['software', 'render', 'image', 'shot']], proj='MyProject'):
+            print(context['shot'], path)
+    """
+    generation = ovfx.cfg.current()
+    # Validate the values before starting the search
+    ovfx.loc.FragBundle(generation).set_value(**values)
+    if models is None:
+        models = [keys for keys, model in generation.models()]
+
+    entries = []
+    for keys in models:
+        model = generation.location()
+        for key in keys:
+            model = model[key]
+        entries.append((tuple(keys), model))
+    # Bound now, the body of the generator only runs when it is iterated
+    list_level = _list_level if not stats.enabled else stats.bind(_list_level)
+    return _walk(_starts(entries, generation.fragment(), values), workers, prune, list_level=list_level)
+
+def _starts(entries, fragment_config, values):
+    """Return the search plan of each (model keys, model) pair. The empty models are skipped."""
+    result = []
+    for keys, model in entries:
+        if not model:
+            continue
+        levels = ovfx.loc._levels(model, fragment_config)
+        plan = levels.plan(values)
+        context = dict((key, values[key]) for key in levels.keys() if key in values)
+        result.append((keys, levels.keys(), plan, context))
+    return result
+
+def _walk(starts, workers, prune, cancel=None, list_level=None):
+    """
+    Search the file system from the plans returned by _starts.
+
+    The search stops as soon as the optional cancel threading.Event is set or the generator is closed.
+    list_level is _list_level, or the version bound to the call site by stats.bind().
+    """
+    list_level = list_level or _list_level
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        try:
+            for keys, tags, plan, context in starts:
+                # Skip the leading literal folders. They don't need to be listed.
+                path, index = _follow_literals(plan, '', 0)
+                if index == len(plan):
+                    if os.path.lexists(path) if not stats.enabled else stats.call('fs.stat', os.path.lexists, path):
+                        yield keys, _ordered(tags, context), path
+                else:
+                    if not path: # The first tag is right after the root or at the beginning of a relative model
+                        path = '/' if index else '.'
+                    pending.add(executor.submit(list_level, keys, tags, plan, path, index, context, prune, cancel))
+
+            while pending and not (cancel is not None and cancel.is_set()):
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    results, children = future.result()
+                    for result in results:
+                        if cancel is not None and cancel.is_set():
+                            return
+                        yield result
+                    for child in children:
+                        pending.add(executor.submit(list_level, *child))
+        finally:
+            for future in pending:
+                future.cancel()
+
+def _list_level(keys, tags, plan, directory, index, context, prune, cancel):
+    """
+    List a directory and match its entries with a level of the model.
+
+    Return the matching paths of the last level and the arguments of the next _list_level calls.
+    """
+    results = []
+    children = []
+    literal, regex, groups = plan[index]
+    last = index + 1 == len(plan)
+    if cancel is not None and cancel.is_set():
+        return results, children
+    if last and prune is not None and prune(keys, directory):
+        return results, children
+    try:
+        with (os.scandir(directory) if not stats.enabled else stats.call('fs.listdir', os.scandir, directory)) as entries:
+            for entry in entries:
+                match = regex.fullmatch(entry.name) if not stats.enabled else stats.call('regex.match', regex.fullmatch, entry.name)
+                if match is None:
+                    continue
+                entry_context = context
+                for key, group in groups:
+                    # The first occurrence of a tag wins
+                    if key not in entry_context:
+                        if entry_context is context:
+                            entry_context = dict(context)
+                        entry_context[key] = match.group(group)
+                if last:
+                    results.append((keys, _ordered(tags, entry_context), entry.path))
+                    continue
+                path, next_index = _follow_literals(plan, entry.path, index + 1)
+                if next_index == len(plan):
+                    if os.path.lexists(path) if not stats.enabled else stats.call('fs.stat', os.path.lexists, path):
+                        results.append((keys, _ordered(tags, entry_context), path))
+                elif path != entry.path or entry.is_dir():
+                    children.append((keys, tags, plan, path, next_index, entry_context, prune, cancel))
+    except (NotADirectoryError, FileNotFoundError, PermissionError):
+        pass
+    return results, children
+
+def _follow_literals(plan, path, index):
+    """Append the consecutive literal levels starting at index to the path"""
+    while index < len(plan) and plan[index][0] is not None:
+        path = '{}/{}'.format(path, plan[index][0]) if index else plan[index][0]
+        index += 1
+    return path, index
+
+def _ordered(tags, context):
+    return collections.OrderedDict((tag, context.get(tag)) for tag in tags)
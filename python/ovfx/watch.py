@@ -0,0 +1,346 @@
+"""
+Follow a sequence while its frames are rendered.
+
+Instead of listing the whole directory again at each refresh, a SeqWatcher receives
+the changes of the sequence directory and updates the file list of the Seq object
+one frame at a time. The cost follows the number of new frames, not the size of
+the sequence.
+
+On Linux the directory is watched with inotify. inotify only sees the changes made
+by the local machine so the network file systems are polled instead: the directory
+is stat at each interval and only listed when its modification time changed. The
+frames not complete yet are the only files stat until their size stops changing.
+
+Each change is reported as a FrameEvent:
+    CREATED    : The frame appeared in the directory
+    COMPLETED  : The frame was closed after writing or renamed in place.
+                 When polling, its size did not change for one interval.
+    DELETED    : The frame was removed
+
+Examples:
+    import ovfx.path
+    import ovfx.watch
+
+    seq = ovfx.path.Seq('/path/to/render/v001/shot_fx_fire_v001.1001.exr')
+    with ovfx.watch.SeqWatcher(seq, callback=print):
+        ...
+        print(seq.frame_range()) # Always up to date
+
+    async for event in ovfx.watch.SeqWatcher(seq):
+        if event.kind == ovfx.watch.COMPLETED:
+            print('Frame {} is ready'.format(event.frame))
+"""
+
+import asyncio
+import collections
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import threading
+
+from ovfx import stats
+
+CREATED = 'created'
+COMPLETED = 'completed'
+DELETED = 'deleted'
+
+FrameEvent = collections.namedtuple('FrameEvent', ['kind', 'frame', 'path'])
+
+# inotify constants from sys/inotify.h
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+_NETWORK_FILE_SYSTEMS = ('nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'fuse.sshfs', 'lustre', 'gpfs', 'beegfs', 'ceph', 'glusterfs', '9p')
+
+_libc = None
+
+def _inotify():
+    """Return the libc with the inotify functions or None when they are not available"""
+    global _libc
+    if _libc is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            libc.inotify_init1
+            libc.inotify_add_watch
+        except (OSError, AttributeError, TypeError):
+            libc = False
+        _libc = libc
+    return _libc or None
+
+def _is_network(path):
+    """Return whether a path is on a network file system according to the mount table"""
+    path = os.path.realpath(path)
+    best = ''
+    fs_type = ''
+    try:
+        with open('/proc/self/mounts') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = fields[1].replace('\\040', ' ')
+                if (path == mount_point or path.startswith(mount_point.rstrip('/') + '/')) and len(mount_point) > len(best):
+                    best = mount_point
+                    fs_type = fields[2]
+    except OSError:
+        return False
+    return fs_type in _NETWORK_FILE_SYSTEMS
+
+class SeqWatcher(object):
+
+    def __init__(self, seq, callback=None, poll_interval=1.0, use_inotify=None):
+        """
+        Args:
+            seq            : ovfx.path.Seq object to keep up to date
+            callback       : Optional function called with each FrameEvent. It is called from the watcher thread.
+            poll_interval  : Number of seconds between the checks when polling. Also how often
+                             a directory not created yet is checked when using inotify.
+            use_inotify    : Use inotify when True, poll when False. When None, inotify is used when
+                             available and the directory is not on a network file system.
+        """
+        self.__seq = seq
+        self.__callback = callback
+        self.__poll_interval = poll_interval
+        # The paths are built like the Seq lists them, without a folder for a bare file name
+        self.__folder = os.path.dirname(seq.path())
+        self.__directory = self.__folder or '.'
+        if use_inotify is None:
+            use_inotify = _inotify() is not None and not _is_network(self.__directory)
+        elif use_inotify and _inotify() is None:
+            raise OSError(errno.ENOSYS, 'inotify is not available on this system')
+        self.__use_inotify = use_inotify
+        self.__thread = None
+        self.__stop = threading.Event()
+        self.__lock = threading.Lock()
+        self.__queues = []
+
+    def __repr__(self):
+        cl = self.__class__
+        mode = 'inotify' if self.__use_inotify else 'polling'
+        result = '<{}.{} object "{}" {} at {}>'.format(cl.__module__, cl.__name__, self.__seq.path(format='*'), mode, hex(id(self)))
+        return result
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def seq(self):
+        return self.__seq
+
+    def uses_inotify(self):
+        return self.__use_inotify
+
+    def start(self):
+        """Start watching in a background thread"""
+        if self.__thread is not None:
+            return
+        self.__stop.clear()
+        # The file list is the baseline of the changes. Listing it later would include the new frames.
+        self.__seq.files()
+        self.__thread = threading.Thread(target=self.__run if not stats.enabled else stats.bind(self.__run), name='ovfx_seq_watcher', daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """Stop watching. The async iterators end."""
+        self.__stop.set()
+        if self.__thread is not None and self.__thread is not threading.current_thread():
+            self.__thread.join()
+        self.__thread = None
+
+    def running(self):
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def __aiter__(self):
+        return self.aevents()
+
+    async def aevents(self):
+        """
+        Return an async generator of the FrameEvent objects. The watcher is started if needed
+        and keeps running after the generator is closed.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        with self.__lock:
+            self.__queues.append((loop, queue))
+        self.start()
+        try:
+            while True:
+                event = await queue.get()
+                if event is None: # Stopped
+                    return
+                yield event
+        finally:
+            with self.__lock:
+                self.__queues.remove((loop, queue))
+
+    def __emit(self, kind, path, frame):
+        event = FrameEvent(kind, frame, path)
+        if self.__callback is not None:
+            self.__callback(event)
+        with self.__lock:
+            queues = list(self.__queues)
+        for loop, queue in queues:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError: # The event loop is closed
+                pass
+
+    def __add(self, path):
+        frame = self.__seq._frame_of(path)
+        if frame is not None and self.__seq._add_file(path):
+            self.__emit(CREATED, path, frame)
+        return frame
+
+    def __remove(self, path):
+        frame = self.__seq._frame_of(path)
+        if frame is not None and self.__seq._remove_file(path):
+            self.__emit(DELETED, path, frame)
+
+    def __run(self):
+        try:
+            if self.__use_inotify:
+                self.__run_inotify()
+            else:
+                self.__run_polling()
+        finally:
+            with self.__lock:
+                queues = list(self.__queues)
+            for loop, queue in queues:
+                try:
+                    loop.call_soon_threadsafe(queue.put_nowait, None)
+                except RuntimeError:
+                    pass
+
+    def __join(self, name):
+        return os.path.join(self.__folder, name) if self.__folder else name
+
+    def __listing(self):
+        """Return the set of files of the directory which are part of the sequence"""
+        result = set()
+        try:
+            with (os.scandir(self.__directory) if not stats.enabled else stats.call('fs.listdir', os.scandir, self.__directory)) as entries:
+                for entry in entries:
+                    path = self.__join(entry.name)
+                    if self.__seq._frame_of(path) is not None:
+                        result.add(path)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            pass
+        return result
+
+    def __resync(self):
+        """Compare the file list with the directory. Return the new files."""
+        found = self.__listing()
+        known = set(self.__seq.files())
+        for path in sorted(known - found):
+            self.__remove(path)
+        added = sorted(found - known)
+        for path in added:
+            self.__add(path)
+        return added
+
+    def __run_inotify(self):
+        libc = _inotify()
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        mask = _IN_CREATE | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_MOVED_FROM | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF
+        try:
+            poller = select.poll()
+            poller.register(fd, select.POLLIN)
+            watching = False
+            while not self.__stop.is_set():
+                if not watching:
+                    # The directory may not exist yet when the render starts
+                    if libc.inotify_add_watch(fd, os.fsencode(self.__directory), mask) < 0:
+                        self.__stop.wait(self.__poll_interval)
+                        continue
+                    watching = True
+                    # The watch is set before the listing so no frame is missed in between
+                    for path in self.__resync():
+                        self.__emit(COMPLETED, path, self.__seq._frame_of(path))
+                if not poller.poll(min(self.__poll_interval, 0.2) * 1000):
+                    continue
+                try:
+                    data = os.read(fd, 65536)
+                except BlockingIOError:
+                    continue
+                offset = 0
+                while offset < len(data):
+                    wd, event_mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                    offset += _EVENT_HEADER.size
+                    name = data[offset:offset + length].rstrip(b'\0')
+                    offset += length
+                    if event_mask & _IN_Q_OVERFLOW:
+                        # Some events were lost. Compare with the directory instead.
+                        for path in self.__resync():
+                            self.__emit(COMPLETED, path, self.__seq._frame_of(path))
+                        continue
+                    if event_mask & (_IN_DELETE_SELF | _IN_MOVE_SELF | _IN_IGNORED):
+                        # The directory is gone. Wait for it to be created again.
+                        watching = False
+                        self.__resync()
+                        continue
+                    if event_mask & _IN_ISDIR or not name:
+                        continue
+                    path = self.__join(os.fsdecode(name))
+                    if event_mask & (_IN_DELETE | _IN_MOVED_FROM):
+                        self.__remove(path)
+                    elif event_mask & _IN_CREATE:
+                        self.__add(path)
+                    elif event_mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO):
+                        frame = self.__add(path)
+                        if frame is not None:
+                            self.__emit(COMPLETED, path, frame)
+        finally:
+            os.close(fd)
+
+    def __run_polling(self):
+        mtime = None
+        pending = {} # Files not complete yet with their last (size, mtime)
+        first = True
+        while not self.__stop.is_set():
+            try:
+                directory_mtime = (os.stat(self.__directory) if not stats.enabled else stats.call('fs.stat', os.stat, self.__directory)).st_mtime_ns
+            except OSError:
+                directory_mtime = None
+            if directory_mtime != mtime:
+                mtime = directory_mtime
+                added = self.__resync()
+                if first:
+                    # The frames found when starting are considered complete
+                    added = []
+                for path in added:
+                    pending[path] = None
+            first = False
+            for path in list(pending):
+                try:
+                    stat = os.stat(path) if not stats.enabled else stats.call('fs.stat', os.stat, path)
+                except OSError:
+                    del pending[path]
+                    continue
+                state = (stat.st_size, stat.st_mtime_ns)
+                if pending[path] == state:
+                    del pending[path]
+                    self.__emit(COMPLETED, path, self.__seq._frame_of(path))
+                else:
+                    pending[path] = state
+            self.__stop.wait(self.__poll_interval)
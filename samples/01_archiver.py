@@ -33,3 +33,10 @@ print('The target location model is: {}'.format(target.model()))
 target_path = source.bundle.translate(target.model())
 print('The source path is: {}'.format(source_path))
 print('The target path is: {}'.format(target_path))
+
+# The ovfx.archive module does the actual archiving from the same two models.
+# Only the files changed since the last run are copied. It is commented out since
+# the sample paths don't exist.
+# import ovfx.archive
+# archiver = ovfx.archive.Archiver.from_project(source.bundle('proj').value())
+# print(archiver.run(dry_run=True))
@@ -19,17 +19,19 @@ mappings = [
     {'source': ['software', 'render', 'geo', 'asset'], 'target': ['publish', 'render', 'geo', 'asset']}
 ]
 
+# Index all the source models so the path is classified against them in a single pass
+index = ovfx.loc.LocationIndex([mapping['source'] for mapping in mappings])
+result = index.first(source_path)
+
 context_found = False
-for mapping in mappings:
-    if not context_found:
-        # Create a location object from the source location model
-        source = ovfx.loc.Location(mapping['source'])
-        # Try to extract the context.
-        source.extract_frags(source_path)
-        if source.valid():
-            context_found = True
-            # Create the target location object
-            target = ovfx.loc.Location(mapping['target'])
+if result:
+    keys, context = result
+    context_found = True
+    # Create a location object from the source location model found by the index
+    source = ovfx.loc.Location(list(keys))
+    source.bundle.set_value(**context)
+    # Create the target location object
+    target = ovfx.loc.Location([mapping['target'] for mapping in mappings if tuple(mapping['source']) == keys][0])
 
 if context_found:
     print(source.info())
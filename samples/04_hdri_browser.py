@@ -15,7 +15,7 @@ project = 'MyProject'
 epis = 'E300'
 seq = '010'
 hdricat = 'car' # If the user wants only HDRIs from the car category
-hdricat = '*' # If the user wants all HDRIs regardless of the category
+hdricat = None # If the user wants all HDRIs regardless of the category
 
 # Create the location object
 hdri = ovfx.loc.Location(['hdri'])
@@ -27,6 +27,28 @@ hdri.bundle.frag('hdricat').set_value(hdricat)
 print(hdri.info())
 print('')
 
-# Apply the current context on the current location model to build the search path
-path = hdri.bundle.translate(hdri.model())
-print('Path used for a glob search: {}'.format(path))
+# Fill the drop down menus with the values found on disk. Each menu only lists the
+# folder level of its fragment and the listings are cached so opening a menu again is instant.
+print('Episodes: {}'.format(hdri.values('epis', proj=project)))
+print('Sequences: {}'.format(hdri.values('seq', proj=project, epis=epis)))
+print('Categories: {}'.format(hdri.values('hdricat')))
+print('')
+
+# Search the file system from the current context. Only the folders needed by the
+# location model are listed and the fragment without a value matches any category.
+# The limit lets the browser show the first thumbnails without waiting for the whole search.
+print('HDRIs found:')
+for path, bundle in hdri.glob(limit=100):
+    print('{}: {}'.format(bundle('hdricat').value(), path))
+
+# A GUI cannot block on a slow file server. The async version streams the results
+# from a pool of threads so the event loop keeps running and the first thumbnails
+# show up while the search goes on. A timeout protects against a mount not responding.
+import asyncio
+
+async def browse():
+    async for path, bundle in hdri.aglob(limit=100, timeout=10):
+        print('{}: {}'.format(bundle('hdricat').value(), path))
+
+print('HDRIs found asynchronously:')
+asyncio.run(browse())